@@ -1,32 +1,174 @@
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import sqlite3
+import atexit
 import json
 import os
 from datetime import datetime
 from typing import Dict, List, Any
 import re
-from flask import send_from_directory
+from flask import send_from_directory, g, Response
+import time
 
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+import db
+from conditions import ConditionTable
+from inference_pool import InferencePool, PoolFull
+from metrics import Histogram, LATENCY_MS_BUCKETS, PrometheusWriter, stage_latency_ms, timed
+from result_cache import ResultCache, cache_key
+
 # Try to import BioBERT, fall back to offline mode if not available
 try:
-    from inference import biobert
+    from inference import model_loader
     BIOBERT_AVAILABLE = True
-    print("✅ BioBERT model loaded successfully")
 except Exception as e:
     BIOBERT_AVAILABLE = False
     print(f"⚠️ BioBERT not available, using offline mode only: {e}")
-    biobert = None
+    model_loader = None
+
+# MODEL_PRELOAD=true loads the model at import time. With gunicorn --preload
+# (see gunicorn.conf.py) that happens once in the master and forked workers
+# share the weights copy-on-write. Otherwise each process loads in the
+# background and diagnose endpoints answer 503 until it is ready.
+MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', 'False').lower() in ('1', 'true', 'yes')
+MODEL_RETRY_AFTER = 5
+
+if model_loader:
+    if MODEL_PRELOAD:
+        model_loader.load()
+    else:
+        model_loader.start(background=True)
+
+# Micro-batching: group concurrent diagnose requests into one forward pass.
+# Only useful with a threaded server (e.g. gunicorn --threads 8).
+INFERENCE_BATCHING = os.environ.get('INFERENCE_BATCHING', 'False').lower() in ('1', 'true', 'yes')
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 8))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', 10))
+
+# Batch endpoint limits: items per request and texts per forward pass
+MAX_BATCH_ITEMS = int(os.environ.get('MAX_BATCH_ITEMS', 100))
+BATCH_FORWARD_SIZE = 32
+
+# Per-condition protocol, red flags and actions, loaded once
+condition_table = ConditionTable.load()
+
+# History pagination
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+def predict_batch(texts):
+    return model_loader.model.predict_batch(texts)
+
+def model_fingerprint():
+    return model_loader.model.model_fingerprint() if model_loader.model else None
+
+batcher = None
+if BIOBERT_AVAILABLE and INFERENCE_BATCHING:
+    from batching import MicroBatcher
+    batcher = MicroBatcher(predict_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+    print(f"Micro-batching enabled (max_batch_size={BATCH_MAX_SIZE}, max_wait_ms={BATCH_MAX_WAIT_MS})")
+
+def run_model(texts):
+    # Single texts go through the micro-batcher when it is enabled
+    if batcher and len(texts) == 1:
+        return [batcher.predict(texts[0])]
+    return predict_batch(texts)
+
+# Tiered inference: a cheap lexicon tier answers inputs it is confident about
+# (confidence >= FAST_PATH_THRESHOLD, 0.85-0.95 scale) without a BioBERT pass
+TIERED_INFERENCE = os.environ.get('TIERED_INFERENCE', 'False').lower() in ('1', 'true', 'yes')
+FAST_PATH_THRESHOLD = float(os.environ.get('FAST_PATH_THRESHOLD', 0.9))
+
+tiered = None
+if BIOBERT_AVAILABLE and TIERED_INFERENCE:
+    from lexicon import SymptomLexicon
+    from tiers import LexiconTier, TieredPredictor
+    tiered = TieredPredictor([LexiconTier(SymptomLexicon.load())], run_model, FAST_PATH_THRESHOLD)
+    print(f"Tiered inference enabled (fast path threshold={FAST_PATH_THRESHOLD})")
+
+# Result cache keyed on the loaded model's version and the normalized symptom
+# string (RESULT_CACHE_SIZE=0 disables)
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 1024))
+RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', 3600))
+
+result_cache = None
+if BIOBERT_AVAILABLE and RESULT_CACHE_SIZE > 0:
+    result_cache = ResultCache(max_entries=RESULT_CACHE_SIZE, ttl_seconds=RESULT_CACHE_TTL)
+
+# Bounded inference pool: model work runs on INFERENCE_WORKERS threads with up
+# to INFERENCE_QUEUE more waiting; beyond that diagnose endpoints answer 503
+# with Retry-After instead of tying up request threads (0 runs inline).
+# asgi.py enables it by default. With micro-batching, single predictions wait
+# on the batcher thread rather than a pool worker, and the admission limit
+# (workers + queue) is raised to at least BATCH_MAX_SIZE so a full batch can form.
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))
+INFERENCE_QUEUE = int(os.environ.get('INFERENCE_QUEUE', 8))
+INFERENCE_RETRY_AFTER = 1
+
+inference_pool = None
+if BIOBERT_AVAILABLE and INFERENCE_WORKERS > 0:
+    inference_queue = INFERENCE_QUEUE
+    if batcher:
+        inference_queue = max(INFERENCE_QUEUE, batcher.max_batch_size - INFERENCE_WORKERS)
+    inference_pool = InferencePool(max_workers=INFERENCE_WORKERS, max_queue=inference_queue)
+    atexit.register(inference_pool.stop)
+    print(f"Inference pool enabled (workers={INFERENCE_WORKERS}, queue={inference_queue})")
+
+def offload(fn, *args):
+    return inference_pool.run(fn, *args) if inference_pool else fn(*args)
+
+def offload_to_batcher(fn, *args):
+    # The forward pass runs on the micro-batcher thread; holding a pool worker
+    # while waiting for it would cap batches at INFERENCE_WORKERS
+    if not inference_pool:
+        return fn(*args)
+    with inference_pool.admitted():
+        return fn(*args)
 
 app = Flask(__name__, static_folder='../frontend', static_url_path='')
 CORS(app)
 
+# Request latency per endpoint, and optional stack sampling of slow requests:
+# PROFILE_SLOW_MS > 0 writes folded stacks (flamegraph.pl / speedscope input)
+# of requests slower than that to PROFILE_DIR
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 0))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+request_latency_ms = {}
+
+profiler = None
+if PROFILE_SLOW_MS > 0:
+    from profiler import SlowRequestProfiler
+    profiler = SlowRequestProfiler(PROFILE_SLOW_MS, interval_ms=PROFILE_INTERVAL_MS, output_dir=PROFILE_DIR)
+    print(f"Slow request profiling enabled (threshold_ms={PROFILE_SLOW_MS}, dir={PROFILE_DIR})")
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if profiler:
+        profiler.start_request()
+
+@app.teardown_request
+def record_request_latency(exc=None):
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    endpoint = request.endpoint or 'unmatched'
+    histogram = request_latency_ms.get(endpoint)
+    if histogram is None:
+        histogram = request_latency_ms.setdefault(endpoint, Histogram(LATENCY_MS_BUCKETS))
+    histogram.observe(elapsed_ms)
+    if profiler:
+        path = profiler.end_request(endpoint, elapsed_ms)
+        if path:
+            print(f"Slow request {request.path} ({elapsed_ms:.0f}ms), stacks written to {path}")
+
 # Serve frontend UI
 @app.route('/')
 def serve_index():
@@ -36,65 +178,101 @@ def serve_index():
 def serve_static(path):
     return send_from_directory(app.static_folder, path)
 
-# Database setup
-DB_NAME = 'medical_data.db'
+# Initialize DB on startup
+db.init_db()
+
+# Optional write-behind for diagnosis_history: rows are queued and inserted
+# in batched transactions by a background thread instead of on the request path
+HISTORY_WRITE_BEHIND = os.environ.get('HISTORY_WRITE_BEHIND', 'False').lower() in ('1', 'true', 'yes')
+HISTORY_FLUSH_SIZE = int(os.environ.get('HISTORY_FLUSH_SIZE', 100))
+HISTORY_FLUSH_INTERVAL_MS = float(os.environ.get('HISTORY_FLUSH_INTERVAL_MS', 200))
 
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # Patients table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS patients (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            age INTEGER,
-            gender TEXT,
-            contact TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Diagnosis history table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS diagnosis_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            patient_id TEXT,
-            symptoms TEXT,
-            diagnosis TEXT,
-            confidence REAL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (patient_id) REFERENCES patients (id)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+history_writer = None
+if HISTORY_WRITE_BEHIND:
+    from history_writer import HistoryWriter
+    history_writer = HistoryWriter(flush_size=HISTORY_FLUSH_SIZE, flush_interval_ms=HISTORY_FLUSH_INTERVAL_MS)
+    # Drain queued rows on graceful shutdown
+    atexit.register(history_writer.stop)
+    print(f"History write-behind enabled (flush_size={HISTORY_FLUSH_SIZE}, flush_interval_ms={HISTORY_FLUSH_INTERVAL_MS})")
 
-# Initialize DB on startup
-init_db()
+def save_history(rows):
+    if history_writer:
+        history_writer.add_many(rows)
+    else:
+        db.add_diagnoses(rows)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'healthy',
         'model_available': BIOBERT_AVAILABLE,
+        'model_state': model_loader.status() if model_loader else {'state': 'unavailable'},
         'mode': 'BioBERT' if BIOBERT_AVAILABLE else 'Offline',
-        'database': 'connected'
+        'database': 'connected',
+        'batching': batcher.stats() if batcher else {'enabled': False},
+        'tiers': tiered.stats() if tiered else {'enabled': False},
+        'inference_pool': inference_pool.stats() if inference_pool else {'enabled': False},
+        'history_writer': history_writer.stats() if history_writer else {'enabled': False},
+        'result_cache': result_cache.stats() if result_cache else {'enabled': False},
+        'profiler': profiler.stats() if profiler else {'enabled': False}
     })
 
+def render_metrics():
+    out = PrometheusWriter()
+    out.histogram('stage_latency_ms', 'Diagnose hot path stage latency in milliseconds',
+                  [({'stage': stage}, h) for stage, h in stage_latency_ms.items()])
+    out.histogram('request_latency_ms', 'Request latency per endpoint in milliseconds',
+                  [({'endpoint': endpoint}, h) for endpoint, h in sorted(request_latency_ms.items())])
+
+    status = model_loader.status() if model_loader else {'state': 'unavailable', 'backend': 'none'}
+    out.gauge('model_ready', 'Whether the model is loaded and serving', int(status['state'] == 'ready'))
+    out.gauge('model_info', 'Model loader state and backend',
+              [({'state': status['state'], 'backend': status.get('backend', 'none')}, 1)])
+    if status.get('load_seconds') is not None:
+        out.gauge('model_load_seconds', 'Time taken to load the model', status['load_seconds'])
+
+    if result_cache:
+        out.counter('result_cache_hits_total', 'Result cache hits', result_cache.hits.value)
+        out.counter('result_cache_misses_total', 'Result cache misses', result_cache.misses.value)
+        out.counter('result_cache_evictions_total', 'Result cache LRU evictions', result_cache.evictions.value)
+        out.counter('result_cache_expirations_total', 'Result cache TTL expirations', result_cache.expirations.value)
+        out.gauge('result_cache_entries', 'Result cache size', result_cache.stats()['size'])
+    if batcher:
+        out.counter('batcher_requests_total', 'Requests run by the micro-batcher', batcher.requests.value)
+        out.counter('batcher_batches_total', 'Forward passes run by the micro-batcher', batcher.batches.value)
+        out.counter('batcher_errors_total', 'Failed micro-batches', batcher.errors.value)
+        out.gauge('batcher_queue_depth', 'Requests waiting for the micro-batcher', batcher.queue_depth)
+        out.histogram('batcher_batch_size', 'Requests per micro-batch', batcher.batch_size)
+        out.histogram('batcher_queue_wait_ms', 'Micro-batcher queue wait in milliseconds', batcher.wait_ms)
+    if inference_pool:
+        out.counter('inference_pool_completed_total', 'Calls run on the inference pool', inference_pool.completed.value)
+        out.counter('inference_pool_rejected_total', 'Calls rejected with 503 (pool full)', inference_pool.rejected.value)
+        out.counter('inference_pool_errors_total', 'Failed inference pool calls', inference_pool.errors.value)
+        out.gauge('inference_pool_in_flight', 'Running and queued inference pool calls',
+                  inference_pool.stats()['in_flight'])
+        out.histogram('inference_pool_queue_wait_ms', 'Inference pool queue wait in milliseconds', inference_pool.wait_ms)
+    if tiered:
+        out.counter('tier_answered_total', 'Predictions answered per inference tier',
+                    [({'tier': name}, c.value) for name, c in tiered.answered.items()])
+    if history_writer:
+        out.counter('history_rows_written_total', 'History rows written by the write-behind queue',
+                    history_writer.rows_written.value)
+        out.counter('history_errors_total', 'Failed history flushes', history_writer.errors.value)
+        out.counter('history_dropped_total', 'History rows dropped after retries', history_writer.dropped.value)
+        out.gauge('history_queue_depth', 'History rows waiting to be written', history_writer.queue_depth)
+    if profiler:
+        out.counter('profiler_dumps_total', 'Slow request profiles written', profiler.dumps.value)
+    return out.text()
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/patients', methods=['POST'])
 def register_patient():
     data = request.json
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('''
-            INSERT OR REPLACE INTO patients (id, name, age, gender, contact)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (data['patient_id'], data['name'], data['age'], data['gender'], data.get('contact', '')))
-        conn.commit()
-        conn.close()
+        db.upsert_patient(data['patient_id'], data['name'], data['age'], data['gender'], data.get('contact', ''))
         return jsonify({'status': 'success', 'message': 'Patient registered'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -102,102 +280,211 @@ def register_patient():
 @app.route('/api/history/<patient_id>', methods=['GET'])
 def get_history(patient_id):
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('''
-            SELECT diagnosis, confidence, timestamp 
-            FROM diagnosis_history 
-            WHERE patient_id = ? 
-            ORDER BY timestamp DESC
-        ''', (patient_id,))
-        rows = c.fetchall()
-        conn.close()
-        
-        history = [{
-            'diagnosis': r[0],
-            'confidence': r[1],
-            'date': r[2]
-        } for r in rows]
-        
-        return jsonify({'status': 'success', 'history': history})
+        limit = int(request.args.get('limit', HISTORY_PAGE_SIZE))
+        before = request.args.get('before')
+        if limit < 1 or limit > HISTORY_MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {HISTORY_MAX_PAGE_SIZE}")
+        if before:
+            db.decode_cursor(before)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    try:
+        history, next_cursor = db.get_history(patient_id, limit=limit, before=before)
+        return jsonify({'status': 'success', 'history': history, 'next_cursor': next_cursor})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def predict(symptoms):
+    key = cache_key(model_fingerprint(), symptoms) if result_cache else None
+    if key is not None:
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached
+
+    run = offload_to_batcher if batcher else offload
+    if tiered:
+        prediction = run(tiered.predict, symptoms)
+    else:
+        prediction = run(run_model, [symptoms])[0]
+
+    # Rule-based fallbacks (model errors) are not cached
+    if key is not None and not prediction.get('fallback'):
+        result_cache.put(key, prediction)
+    return prediction
+
+def predict_many(texts):
+    predictions = [None] * len(texts)
+    version = model_fingerprint()
+    keys = [cache_key(version, t) for t in texts] if result_cache else [None] * len(texts)
+    misses = []
+    for i, key in enumerate(keys):
+        cached = result_cache.get(key) if key is not None else None
+        if cached is not None:
+            predictions[i] = cached
+        else:
+            misses.append(i)
+
+    for start in range(0, len(misses), BATCH_FORWARD_SIZE):
+        chunk = misses[start:start + BATCH_FORWARD_SIZE]
+        run = tiered.predict_batch if tiered else predict_batch
+        for i, prediction in zip(chunk, offload(run, [texts[i] for i in chunk])):
+            predictions[i] = prediction
+            if keys[i] is not None and not prediction.get('fallback'):
+                result_cache.put(keys[i], prediction)
+    return predictions
+
+def model_unavailable_response():
+    """Response for diagnose endpoints when BioBERT cannot serve, or None if it can."""
+    if BIOBERT_AVAILABLE and not model_loader.is_loaded:
+        response = jsonify({
+            'status': 'loading',
+            'message': 'BioBERT model is still loading, retry shortly',
+            'mode': 'loading'
+        })
+        response.headers['Retry-After'] = str(MODEL_RETRY_AFTER)
+        return response, 503
+
+    if not (BIOBERT_AVAILABLE and model_loader.model):
+        return jsonify({
+            'status': 'info',
+            'message': 'BioBERT model not available, use frontend offline mode for diagnosis',
+            'mode': 'offline_only'
+        })
+    return None
+
+def busy_response():
+    response = jsonify({
+        'status': 'busy',
+        'message': 'Inference queue is full, retry shortly',
+        'mode': 'busy'
+    })
+    response.headers['Retry-After'] = str(INFERENCE_RETRY_AFTER)
+    return response, 503
+
+def build_diagnosis_response(symptoms, prediction):
+    primary_diagnosis = prediction['disease']
+    confidence = prediction['confidence']
+    condition = condition_table.get(primary_diagnosis)
+
+    # Differentials are the model's other top-k candidates; protocol text comes
+    # from the condition table. In a real system, another model might generate it.
+    differentials = [
+        {
+            'condition': candidate['disease'],
+            'probability': round(candidate['confidence'], 4),
+            'reasoning': condition_table.get(candidate['disease'])['summary']
+        }
+        for candidate in prediction.get('differential', [])
+        if not condition_table.same_condition(candidate['disease'], primary_diagnosis)
+    ]
+
+    return {
+        'primary_diagnosis': primary_diagnosis,
+        'confidence_score': round(confidence * 100, 1),
+        'differential_diagnoses': differentials,
+        'treatment_protocol': {
+            'medications': condition['medications'],
+            'lifestyle_advice': condition['lifestyle_advice']
+        },
+        'immediate_actions': condition['immediate_actions'],
+        'red_flags': condition['red_flags'],
+        'referral_needed': confidence < 0.6,
+        'referral_specialty': condition['referral_specialty'],
+        'patient_explanation': f"Based on analysis of '{symptoms}', the BioBERT model indicates {primary_diagnosis} with {round(confidence*100)}% confidence."
+    }
+
 @app.route('/api/diagnose', methods=['POST'])
 def diagnose():
     data = request.json
     symptoms = data.get('symptoms', '')
     patient_id = data.get('patient_id')
     
-    if not symptoms:
+    if not isinstance(symptoms, str) or not symptoms.strip():
         return jsonify({'status': 'error', 'message': 'No symptoms provided'}), 400
 
+    unavailable = model_unavailable_response()
+    if unavailable:
+        # Frontend falls back to its offline engine
+        print(f"BioBERT not ready, deferring to offline diagnosis for: {symptoms}")
+        return unavailable
+
     try:
-        # 1. Run BioBERT Inference (if available)
-        if BIOBERT_AVAILABLE and biobert:
-            print(f"Running BioBERT diagnosis for: {symptoms}")
-            prediction = biobert.predict(symptoms)
-            
-            primary_diagnosis = prediction['disease']
-            confidence = prediction['confidence']
-        else:
-            # Fallback to simple offline diagnosis
-            print(f"Running offline diagnosis for: {symptoms}")
+        # 1. Run BioBERT Inference
+        print(f"Running BioBERT diagnosis for: {symptoms}")
+        prediction = predict(symptoms)
+
+        # 2. Save to History
+        if patient_id:
+            with timed('db_write'):
+                save_history([(patient_id, symptoms, prediction['disease'], prediction['confidence'])])
+
+        # 3. Generate structured response
+        with timed('serialize'):
             return jsonify({
-                'status': 'info',
-                'message': 'BioBERT model not available, use frontend offline mode for diagnosis',
-                'mode': 'offline_only'
+                'status': 'success',
+                'diagnosis': build_diagnosis_response(symptoms, prediction)
             })
 
-        # 2. Generate structured response (simulating full medical report)
-        # In a real system, another model might generate the text. 
-        # Here we use templates based on the diagnosis.
-        
-        response_data = {
-            'primary_diagnosis': primary_diagnosis,
-            'confidence_score': round(confidence * 100, 1),
-            'differential_diagnoses': [
-                {'condition': 'Viral Infection', 'probability': '15%'},
-                {'condition': 'Bacterial Infection', 'probability': '10%'}
-            ],
-            'treatment_protocol': {
-                'medications': [
-                    {'name': 'Symptomatic relief', 'dosage': 'As needed', 'duration': '3-5 days'}
-                ],
-                'lifestyle_advice': [
-                    'Rest and hydration',
-                    'Monitor temperature',
-                    'Nutritious diet'
-                ]
-            },
-            'immediate_actions': [
-                'Monitor symptoms',
-                'Consult doctor if worsens'
-            ],
-            'red_flags': [
-                'High fever > 103F',
-                'Difficulty breathing'
-            ],
-            'referral_needed': confidence < 0.6,
-            'patient_explanation': f"Based on analysis of '{symptoms}', the BioBERT model indicates {primary_diagnosis} with {round(confidence*100)}% confidence."
-        }
+    except PoolFull:
+        return busy_response()
+    except Exception as e:
+        print(f"Error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
 
-        # 3. Save to History
-        if patient_id:
-            conn = sqlite3.connect(DB_NAME)
-            c = conn.cursor()
-            c.execute('''
-                INSERT INTO diagnosis_history (patient_id, symptoms, diagnosis, confidence)
-                VALUES (?, ?, ?, ?)
-            ''', (patient_id, symptoms, primary_diagnosis, confidence))
-            conn.commit()
-            conn.close()
+@app.route('/api/diagnose/batch', methods=['POST'])
+def diagnose_batch():
+    data = request.json
+    items = data.get('items') if isinstance(data, dict) else data
 
-        return jsonify({
-            'status': 'success',
-            'diagnosis': response_data
-        })
+    if not isinstance(items, list) or not items:
+        return jsonify({'status': 'error', 'message': 'Expected a non-empty list of items'}), 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({'status': 'error', 'message': f'Too many items (max {MAX_BATCH_ITEMS})'}), 400
+
+    unavailable = model_unavailable_response()
+    if unavailable:
+        return unavailable
+
+    try:
+        # Validate per item; invalid items get an error entry in their slot
+        results = [None] * len(items)
+        valid = []
+        for i, item in enumerate(items):
+            symptoms = item.get('symptoms', '') if isinstance(item, dict) else ''
+            if not isinstance(symptoms, str) or not symptoms.strip():
+                results[i] = {'status': 'error', 'message': 'No symptoms provided'}
+            else:
+                valid.append((i, item.get('patient_id'), symptoms))
+
+        print(f"Running batched BioBERT diagnosis for {len(valid)} items")
+        predictions = predict_many([symptoms for _, _, symptoms in valid])
+
+        history_rows = []
+        for (i, patient_id, symptoms), prediction in zip(valid, predictions):
+            results[i] = {
+                'status': 'success',
+                'patient_id': patient_id,
+                'diagnosis': build_diagnosis_response(symptoms, prediction)
+            }
+            if patient_id:
+                history_rows.append((patient_id, symptoms, prediction['disease'], prediction['confidence']))
+
+        # Save all history rows in a single transaction
+        if history_rows:
+            with timed('db_write'):
+                save_history(history_rows)
+
+        with timed('serialize'):
+            return jsonify({
+                'status': 'success',
+                'count': len(results),
+                'errors': sum(1 for r in results if r['status'] == 'error'),
+                'results': results
+            })
 
+    except PoolFull:
+        return busy_response()
     except Exception as e:
         print(f"Error: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -0,0 +1,33 @@
+"""
+ASGI entry point: the same Flask routes behind an async server.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+Requests are handled on a thread pool by a2wsgi, and model work is offloaded
+to the bounded inference pool (INFERENCE_WORKERS, enabled here by default).
+The request pool always keeps ASGI_RESERVED_THREADS more threads than the
+inference pool can occupy, so health, history and static requests are served
+while inference is saturated; excess diagnose requests get 503 + Retry-After.
+"""
+
+import os
+
+# Defaults for async serving; explicit settings in the environment win
+os.environ.setdefault('INFERENCE_WORKERS', '2')
+
+from a2wsgi import WSGIMiddleware
+
+from app import app as flask_app, inference_pool, INFERENCE_QUEUE, INFERENCE_WORKERS
+
+ASGI_RESERVED_THREADS = int(os.environ.get('ASGI_RESERVED_THREADS', 4))
+
+# Request threads blocked on inference are bounded by the pool's capacity, which
+# app.py may raise above INFERENCE_QUEUE (room for a full micro-batch)
+if inference_pool:
+    inference_capacity = inference_pool.max_workers + inference_pool.max_queue
+else:
+    inference_capacity = INFERENCE_WORKERS + INFERENCE_QUEUE
+threads = inference_capacity + ASGI_RESERVED_THREADS
+
+app = WSGIMiddleware(flask_app, workers=threads)
+print(f"ASGI app ready ({threads} request threads, {ASGI_RESERVED_THREADS} reserved for non-inference requests)")
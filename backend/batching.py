@@ -0,0 +1,126 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import Counter, Histogram, BATCH_SIZE_BUCKETS
+
+# Queue wait buckets in milliseconds
+WAIT_MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+class MicroBatcher:
+    """Collects concurrent predict requests and runs them as one forward pass.
+
+    A single worker thread waits for the first request, then keeps gathering
+    more for up to ``max_wait_ms`` or until ``max_batch_size`` is reached, and
+    hands the whole group to ``predict_batch``. Each caller gets its own result
+    (or exception) through a Future.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=8, max_wait_ms=10):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._stopped = False
+
+        self.batches = Counter()
+        self.requests = Counter()
+        self.errors = Counter()
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_ms = Histogram(WAIT_MS_BUCKETS)
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, text):
+        if self._stopped:
+            raise RuntimeError('Batcher is stopped')
+        self._ensure_started()
+        future = Future()
+        self._queue.put((text, future, time.monotonic()))
+        return future
+
+    def predict(self, text, timeout=None):
+        return self.submit(text).result(timeout=timeout)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stop(self):
+        self._stopped = True
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so (re)start lazily in each process
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    def stats(self):
+        return {
+            'enabled': True,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': round(self.max_wait * 1000, 3),
+            'queue_depth': self.queue_depth,
+            'requests': self.requests.value,
+            'batches': self.batches.value,
+            'errors': self.errors.value,
+            'batch_size': self.batch_size.snapshot(),
+            'queue_wait_ms': self.wait_ms.snapshot()
+        }
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Stop sentinel: finish this batch, then exit
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = self._collect(first)
+
+            started = time.monotonic()
+            for _, _, enqueued in batch:
+                self.wait_ms.observe((started - enqueued) * 1000)
+            self.batches.inc()
+            self.requests.inc(len(batch))
+            self.batch_size.observe(len(batch))
+
+            texts = [text for text, _, _ in batch]
+            try:
+                results = self.predict_batch(texts)
+            except Exception as e:
+                self.errors.inc()
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
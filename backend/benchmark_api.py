@@ -0,0 +1,321 @@
+"""
+Load and latency benchmark for the API, run in-process.
+
+Drives every endpoint through the Flask test client (or a running server
+with --url) from --concurrency threads and reports throughput and p50/p95/p99
+latency per endpoint. The model is a stub by default, so no BioBERT download
+or torch install is needed:
+
+    stub    lexicon-based predictions with --stub-latency-ms of simulated work
+    linear  the NumPy model from train_linear.py (model/linear)
+    real    whatever inference.py loads (INFERENCE_BACKEND, MODEL_PATH)
+
+Results are written as JSON; --compare prints the change against an earlier
+result file, e.g. one saved on the previous commit.
+
+Usage: python benchmark_api.py [--model stub] [--requests 200] [--concurrency 4]
+                               [--output benchmark_api.json] [--compare old.json]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+OUTPUT_PATH = "benchmark_api.json"
+WARMUP_REQUESTS = 5
+
+SYMPTOMS = [
+    "high fever with chills and sweating every evening",
+    "fever, severe headache, pain behind the eyes and joint pain",
+    "persistent cough with blood and night sweats",
+    "burning sensation in chest after meals",
+    "frequent urination, excessive thirst and blurred vision",
+    "yellow eyes, dark urine and abdominal pain",
+    "runny nose, sneezing and sore throat",
+    "vomiting and watery diarrhea since morning"
+]
+
+# ---------------------------------------------------------------------------
+# Stub model
+# ---------------------------------------------------------------------------
+
+class StubDiagnosis:
+    """Stands in for BioBERTDiagnosis: lexicon hits, else a fixed distribution."""
+
+    backend = 'stub'
+    load_error = None
+
+    def __init__(self, latency_ms=0.0):
+        from lexicon import SymptomLexicon
+        self.lexicon = SymptomLexicon.load()
+        self.latency = latency_ms / 1000.0
+
+    def predict(self, text):
+        return self.predict_batch([text])[0]
+
+    def predict_batch(self, texts):
+        # One simulated forward pass per batch, like the real model
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._predict(text) for text in texts]
+
+    def _predict(self, text):
+        hits = list(self.lexicon.disease_hits(text))
+        differential = [{'disease': d, 'confidence': 0.6 / (i + 1)} for i, d in enumerate(hits[:3])]
+        differential = differential or [{'disease': 'Viral Fever', 'confidence': 0.4},
+                                        {'disease': 'Common Cold', 'confidence': 0.3}]
+        return dict(differential[0], differential=differential)
+
+    def model_fingerprint(self):
+        return 'stub'
+
+class StubLoader:
+    """Already-loaded stand-in for inference.ModelLoader."""
+
+    state = 'ready'
+    error = None
+    load_seconds = 0.0
+    is_loaded = True
+
+    def __init__(self, model):
+        self.model = model
+
+    def start(self, background=True):
+        pass
+
+    def load(self):
+        return self.model
+
+    def after_fork(self):
+        pass
+
+    def status(self):
+        return {'state': self.state, 'error': None, 'load_seconds': 0.0, 'backend': 'stub'}
+
+def load_app(model, stub_latency_ms):
+    """Import app.py against a scratch database and the chosen model."""
+    workdir = tempfile.mkdtemp(prefix='api_bench_')
+    os.environ['DATABASE_PATH'] = os.path.join(workdir, 'bench.db')
+    # Load synchronously so no request sees the 503 'loading' answer
+    os.environ['MODEL_PRELOAD'] = 'True'
+
+    if model == 'stub':
+        inference = types.ModuleType('inference')
+        inference.model_loader = StubLoader(StubDiagnosis(stub_latency_ms))
+        sys.modules['inference'] = inference
+    elif model == 'linear':
+        os.environ['INFERENCE_BACKEND'] = 'linear'
+
+    import app
+    if not app.BIOBERT_AVAILABLE:
+        raise SystemExit("Model could not be imported; see the message above")
+    return app.app
+
+# ---------------------------------------------------------------------------
+# Clients
+# ---------------------------------------------------------------------------
+
+class TestClientTransport:
+    """Flask test client per thread."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.flask_app.test_client()
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code
+
+class HttpTransport:
+    """Plain urllib against a running server."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+def symptoms_for(i, warm_cache):
+    text = SYMPTOMS[i % len(SYMPTOMS)]
+    # A distinct token per request keeps the result cache cold
+    return text if warm_cache else f"{text} case{i}"
+
+def build_scenarios(batch_size, warm_cache):
+    """name -> request(i) returning (method, path, body)."""
+    return {
+        'health': lambda i: ('GET', '/api/health', None),
+        'static_index': lambda i: ('GET', '/', None),
+        'register_patient': lambda i: ('POST', '/api/patients', {
+            'patient_id': f"BENCH{i % 50:03d}", 'name': 'Bench Patient',
+            'age': 30 + i % 40, 'gender': 'female', 'contact': ''
+        }),
+        'diagnose': lambda i: ('POST', '/api/diagnose', {
+            'symptoms': symptoms_for(i, warm_cache), 'patient_id': f"BENCH{i % 50:03d}"
+        }),
+        'diagnose_batch': lambda i: ('POST', '/api/diagnose/batch', {'items': [
+            {'symptoms': symptoms_for(i * batch_size + j, warm_cache), 'patient_id': f"BENCH{i % 50:03d}"}
+            for j in range(batch_size)
+        ]}),
+        'history': lambda i: ('GET', f"/api/history/BENCH{i % 50:03d}?limit=20", None),
+        'metrics': lambda i: ('GET', '/api/metrics', None)
+    }
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+    return {
+        'p50': round(pick(50), 3),
+        'p95': round(pick(95), 3),
+        'p99': round(pick(99), 3),
+        'mean': round(sum(ordered) / len(ordered), 3),
+        'max': round(ordered[-1], 3)
+    }
+
+def run_scenario(transport, make_request, requests, concurrency):
+    for i in range(WARMUP_REQUESTS):
+        transport.request(*make_request(-1 - i))
+
+    def timed_request(i):
+        started = time.perf_counter()
+        status = transport.request(*make_request(i))
+        return status, (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(timed_request, range(requests)))
+    seconds = time.perf_counter() - started
+
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': requests,
+        'errors': sum(1 for status, _ in results if status >= 400),
+        'status_codes': statuses,
+        'seconds': round(seconds, 3),
+        'throughput_rps': round(requests / seconds, 1),
+        'latency_ms': percentiles([ms for _, ms in results])
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+def compare(report, baseline, baseline_path):
+    print(f"\nChange vs {baseline_path} (commit {baseline.get('commit')}):")
+    for name, result in report['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        change = lambda new, old: f"{(new - old) / old:+.1%}" if old else "n/a"
+        print(f"{name:18s} throughput {change(result['throughput_rps'], before['throughput_rps']):>8} | "
+              f"p50 {change(result['latency_ms']['p50'], before['latency_ms']['p50']):>8} | "
+              f"p99 {change(result['latency_ms']['p99'], before['latency_ms']['p99']):>8}")
+
+def run_benchmark(args):
+    # Read the baseline up front: a missing file should fail before the run,
+    # and the run must not be compared against its own output
+    baseline = load_baseline(args.compare) if args.compare else None
+
+    if args.url:
+        transport = HttpTransport(args.url)
+        target = args.url
+    else:
+        transport = TestClientTransport(load_app(args.model, args.stub_latency_ms))
+        target = 'in-process'
+
+    scenarios = build_scenarios(args.batch_size, args.warm_cache)
+    selected = args.endpoints.split(',') if args.endpoints else list(scenarios)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'config': {
+            'target': target,
+            'model': None if args.url else args.model,
+            'stub_latency_ms': args.stub_latency_ms if args.model == 'stub' and not args.url else None,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'batch_size': args.batch_size,
+            'warm_cache': args.warm_cache
+        },
+        'endpoints': {}
+    }
+
+    print(f"Target: {target} | model={report['config']['model']} | "
+          f"{args.requests} requests x {args.concurrency} threads per endpoint")
+    print(f"{'endpoint':18s} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | errors")
+    print("-" * 75)
+    for name in selected:
+        # The app prints a line per diagnosis; keep the table readable
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+            result = run_scenario(transport, scenarios[name], args.requests, args.concurrency)
+        report['endpoints'][name] = result
+        latency = result['latency_ms']
+        print(f"{name:18s} | {result['throughput_rps']:8.1f} | {latency['p50']:8.3f} | "
+              f"{latency['p95']:8.3f} | {latency['p99']:8.3f} | {result['errors']}")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if baseline is not None:
+        compare(report, baseline, args.compare)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark API throughput and latency per endpoint")
+    parser.add_argument('--model', choices=('stub', 'linear', 'real'), default='stub',
+                        help="Model behind the in-process app")
+    parser.add_argument('--stub-latency-ms', type=float, default=20.0,
+                        help="Simulated forward pass time of the stub model")
+    parser.add_argument('--url', help="Benchmark a running server instead, e.g. http://localhost:5000")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint")
+    parser.add_argument('--concurrency', type=int, default=4, help="Concurrent client threads")
+    parser.add_argument('--batch-size', type=int, default=8, help="Items per /api/diagnose/batch request")
+    parser.add_argument('--warm-cache', action='store_true',
+                        help="Repeat the same symptom texts so the result cache answers")
+    parser.add_argument('--endpoints', help="Comma-separated subset of endpoints to run")
+    parser.add_argument('--verbose', action='store_true', help="Show the app's per-request output")
+    parser.add_argument('--output', default=OUTPUT_PATH, help="JSON results file")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    args = parser.parse_args()
+    if args.compare and os.path.abspath(args.compare) == os.path.abspath(args.output):
+        parser.error("--compare must differ from --output, which this run overwrites")
+    return args
+
+if __name__ == "__main__":
+    run_benchmark(parse_args())
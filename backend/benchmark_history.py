@@ -0,0 +1,93 @@
+"""
+Benchmark for patient history queries.
+Grows a scratch diagnosis_history table step by step and times the paginated
+history query at each size, to check latency stays flat as the table grows.
+
+Usage: python benchmark_history.py [--sizes 10000,100000,1000000] [--unindexed]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import db
+
+DISEASES = ['Malaria', 'Dengue', 'Typhoid', 'Pneumonia', 'Common Cold', 'Viral Fever']
+ROWS_PER_PATIENT = 40
+INSERT_CHUNK = 50000
+
+def populate(conn, start, stop):
+    base = datetime(2024, 1, 1)
+    rng = random.Random(start)
+    for chunk_start in range(start, stop, INSERT_CHUNK):
+        chunk_stop = min(chunk_start + INSERT_CHUNK, stop)
+        rows = []
+        for i in range(chunk_start, chunk_stop):
+            patient_id = f"P{rng.randrange(max(1, stop // ROWS_PER_PATIENT)):07d}"
+            timestamp = (base + timedelta(seconds=i * 30)).strftime('%Y-%m-%d %H:%M:%S')
+            rows.append((patient_id, 'fever and headache', rng.choice(DISEASES), rng.random(), timestamp))
+        with conn:
+            conn.executemany('''
+                INSERT INTO diagnosis_history (patient_id, symptoms, diagnosis, confidence, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def time_queries(patient_ids, queries, limit):
+    first_page, second_page = [], []
+    for patient_id in random.Random(0).choices(patient_ids, k=queries):
+        t0 = time.perf_counter()
+        _, cursor = db.get_history(patient_id, limit=limit)
+        first_page.append((time.perf_counter() - t0) * 1000)
+        if cursor:
+            t0 = time.perf_counter()
+            db.get_history(patient_id, limit=limit, before=cursor)
+            second_page.append((time.perf_counter() - t0) * 1000)
+    return first_page, second_page
+
+def run_benchmark(sizes, queries, limit, unindexed):
+    workdir = tempfile.mkdtemp(prefix='history_bench_')
+    db.DB_NAME = os.path.join(workdir, 'bench.db')
+    db.init_db()
+
+    conn = db.get_connection()
+    if unindexed:
+        conn.execute('DROP INDEX IF EXISTS idx_history_patient_ts')
+
+    print(f"Database: {db.DB_NAME} ({'no index' if unindexed else 'indexed'}, limit={limit})")
+    print(f"{'rows':>10} | {'p50 ms':>8} | {'p95 ms':>8} | {'page2 p50':>9} | {'plan'}")
+    print("-" * 80)
+
+    rows = 0
+    for size in sizes:
+        populate(conn, rows, size)
+        rows = size
+        conn.execute('ANALYZE')
+
+        patient_ids = [f"P{i:07d}" for i in range(max(1, size // ROWS_PER_PATIENT))]
+        plan = conn.execute('EXPLAIN QUERY PLAN ' + db.SQL_SELECT_HISTORY, ('P0000000', limit)).fetchall()
+        first, second = time_queries(patient_ids, queries, limit)
+        page2 = f"{percentile(second, 50):9.3f}" if second else f"{'-':>9}"
+        print(f"{size:>10} | {percentile(first, 50):8.3f} | {percentile(first, 95):8.3f} | {page2} | {plan[-1][-1]}")
+
+    db.close_connection()
+    print(f"\nScratch database left at {db.DB_NAME}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark paginated history queries")
+    parser.add_argument('--sizes', default='10000,100000,1000000,3000000',
+                        help="Comma-separated table sizes to measure at")
+    parser.add_argument('--queries', type=int, default=200, help="Queries per size")
+    parser.add_argument('--limit', type=int, default=50, help="Page size")
+    parser.add_argument('--unindexed', action='store_true',
+                        help="Drop the composite index to compare against a full scan")
+    args = parser.parse_args()
+
+    sizes = sorted(int(s) for s in args.sizes.split(','))
+    run_benchmark(sizes, args.queries, args.limit, args.unindexed)
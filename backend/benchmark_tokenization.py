@@ -0,0 +1,115 @@
+"""
+Tokenization + forward pass throughput benchmark.
+Compares the old serving path (one transformers tokenizer call per request,
+max_length=512) against the length-bucketed fast path used by
+BioBERTDiagnosis.forward, in real (non-padding) tokens per second.
+
+Usage: python benchmark_tokenization.py [--batch-size 16] [--repeat 3]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from inference import model_loader
+from tokenization import group_by_bucket
+
+DATA_PATH = "data/training_data.csv"
+
+def baseline_per_request(biobert, texts, hf_tokenizer):
+    padded = 0
+    for text in texts:
+        inputs = hf_tokenizer(text, return_tensors="np", truncation=True, padding=True, max_length=512)
+        biobert.backend.logits(dict(inputs))
+        padded += inputs['input_ids'].size
+    return padded
+
+def baseline_batched(biobert, texts, hf_tokenizer, batch_size):
+    padded = 0
+    for start in range(0, len(texts), batch_size):
+        inputs = hf_tokenizer(texts[start:start + batch_size], return_tensors="np",
+                              truncation=True, padding=True, max_length=512)
+        biobert.backend.logits(dict(inputs))
+        padded += inputs['input_ids'].size
+    return padded
+
+def bucketed(biobert, texts, batch_size):
+    for start in range(0, len(texts), batch_size):
+        biobert.forward(texts[start:start + batch_size])
+
+def bucketed_padding(biobert, texts, batch_size):
+    padded = 0
+    for start in range(0, len(texts), batch_size):
+        ids = biobert.tokenizer.encode(texts[start:start + batch_size], biobert.max_length)
+        for indices in group_by_bucket(ids, biobert.buckets).values():
+            padded += len(indices) * max(len(ids[i]) for i in indices)
+    return padded
+
+def tokenize_only(biobert, texts, hf_tokenizer, batch_size):
+    timings = {}
+    start = time.perf_counter()
+    for text in texts:
+        hf_tokenizer(text, return_tensors="np", truncation=True, padding=True, max_length=512)
+    timings['transformers, per request'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        chunk = texts[i:i + batch_size]
+        ids = biobert.tokenizer.encode(chunk, biobert.max_length)
+        biobert.tokenizer.pack(ids, max(len(row) for row in ids))
+    timings['fast path, batched'] = time.perf_counter() - start
+    return timings
+
+def run_benchmark(batch_size, repeat):
+    from transformers import AutoTokenizer
+
+    biobert = model_loader.load()
+    if not biobert.backend:
+        print("Model not loaded; nothing to benchmark")
+        return
+
+    hf_tokenizer = AutoTokenizer.from_pretrained(biobert.model_name)
+    texts = pd.read_csv(DATA_PATH)['symptoms'].astype(str).tolist() * repeat
+    real_tokens = sum(len(row) for row in biobert.tokenizer.encode(texts, biobert.max_length))
+
+    print(f"{len(texts)} texts, {real_tokens} real tokens, mean {real_tokens / len(texts):.1f} tokens/text, "
+          f"max_length={biobert.max_length}, buckets={biobert.buckets}")
+
+    print("\nTokenization only:")
+    for name, seconds in tokenize_only(biobert, texts, hf_tokenizer, batch_size).items():
+        print(f"  {name:<28} {real_tokens / seconds:12,.0f} tokens/s")
+
+    print(f"\nTokenize + forward (batch size {batch_size}):")
+    print(f"  {'mode':<28} {'tokens/s':>12} {'padding':>9}")
+    runs = (
+        ('before: per request', lambda: baseline_per_request(biobert, texts, hf_tokenizer)),
+        ('before: batched, 512 cap', lambda: baseline_batched(biobert, texts, hf_tokenizer, batch_size)),
+        ('after: length buckets', lambda: bucketed(biobert, texts, batch_size)),
+    )
+    for name, fn in runs:
+        fn()  # warm up
+        start = time.perf_counter()
+        padded = fn()
+        seconds = time.perf_counter() - start
+        if padded is None:
+            padded = bucketed_padding(biobert, texts, batch_size)
+        waste = 1 - real_tokens / padded
+        print(f"  {name:<28} {real_tokens / seconds:12,.0f} {waste:8.1%}")
+
+    # Sanity check: the fast path must not change predictions
+    reference = np.concatenate([
+        biobert.backend.logits(dict(hf_tokenizer(texts[i:i + 1], return_tensors="np", truncation=True,
+                                                  max_length=biobert.max_length)))
+        for i in range(min(len(texts), 32))
+    ])
+    fast = biobert.forward(texts[:32])
+    print(f"\nMax |logit diff| vs unpadded reference: {np.abs(reference - fast).max():.2e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark tokenization throughput")
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=3, help="Repeat the dataset to get stable timings")
+    args = parser.parse_args()
+    run_benchmark(args.batch_size, args.repeat)
@@ -0,0 +1,42 @@
+import json
+import os
+import re
+
+CONDITIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'conditions.json')
+
+# Trailing annotations the prediction path adds, e.g. "Malaria (BioBERT Detected)"
+_ANNOTATION = re.compile(r"\s*\([^)]*\)\s*$")
+
+def condition_key(name):
+    return _ANNOTATION.sub('', name).strip().lower()
+
+class ConditionTable:
+    """Treatment protocol, red flags and actions per condition.
+
+    Loaded once from data/conditions.json; lookups by any label spelling
+    (name, alias, or with a "(... Detected)" suffix) are a single dict get.
+    Unknown conditions get the "default" entry.
+    """
+
+    def __init__(self, conditions, default):
+        self.default = default
+        self._by_key = {}
+        for name, entry in conditions.items():
+            entry = dict(entry, name=name)
+            for key in [name] + entry.pop('aliases', []):
+                self._by_key[condition_key(key)] = entry
+
+    @classmethod
+    def load(cls, path=CONDITIONS_PATH):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data['conditions'], data['default'])
+
+    def get(self, name):
+        return self._by_key.get(condition_key(name), self.default)
+
+    def same_condition(self, a, b):
+        entry = self._by_key.get(condition_key(a))
+        if entry is None:
+            return condition_key(a) == condition_key(b)
+        return entry is self._by_key.get(condition_key(b))
@@ -0,0 +1,112 @@
+"""
+One-time tokenization cache for training and evaluation.
+
+The dataset is tokenized once into .npy files (input_ids, attention_mask,
+lengths, labels) under a directory named after a hash of the tokenizer,
+max length and dataset contents. Later runs open those files memory-mapped,
+so epochs and DataLoader workers read token ids straight from the page cache
+instead of re-tokenizing every sample.
+
+Usage: python dataset_cache.py [--data data/expanded_training_data.csv]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+CACHE_DIR = "data/cache"
+ENCODE_CHUNK = 1024
+ARRAYS = ('input_ids', 'attention_mask', 'lengths', 'labels')
+
+def cache_key(tokenizer, texts, labels, max_len):
+    """Hash of everything that affects the tokenized arrays."""
+    # Padding/truncation settings are mutated by every tokenizer call; leave them out
+    config = json.loads(tokenizer.backend_tokenizer.to_str())
+    config.pop('padding', None)
+    config.pop('truncation', None)
+
+    digest = hashlib.sha1()
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    digest.update(f"|{max_len}|{len(texts)}|".encode())
+    for text, label in zip(texts, labels):
+        digest.update(f"{text}\x1f{label}\x1e".encode())
+    return digest.hexdigest()[:16]
+
+def build_cache(tokenizer, texts, labels, max_len, path):
+    """Tokenize texts into memory-mapped arrays under path, padded to max_len.
+
+    Writes into a temporary directory that is renamed at the end, so an
+    interrupted run never leaves a half-written cache behind.
+    """
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    n = len(texts)
+    input_ids = np.lib.format.open_memmap(os.path.join(tmp_path, 'input_ids.npy'), mode='w+',
+                                          dtype=np.int64, shape=(n, max_len))
+    attention_mask = np.lib.format.open_memmap(os.path.join(tmp_path, 'attention_mask.npy'), mode='w+',
+                                               dtype=np.int64, shape=(n, max_len))
+    lengths = np.empty(n, dtype=np.int32)
+
+    for start in range(0, n, ENCODE_CHUNK):
+        chunk = [str(t) for t in texts[start:start + ENCODE_CHUNK]]
+        encoding = tokenizer(chunk, max_length=max_len, padding='max_length', truncation=True,
+                             return_token_type_ids=False, return_tensors='np')
+        end = start + len(chunk)
+        input_ids[start:end] = encoding['input_ids']
+        attention_mask[start:end] = encoding['attention_mask']
+        lengths[start:end] = encoding['attention_mask'].sum(axis=1)
+
+    input_ids.flush()
+    attention_mask.flush()
+    np.save(os.path.join(tmp_path, 'lengths.npy'), lengths)
+    np.save(os.path.join(tmp_path, 'labels.npy'), np.asarray(labels, dtype=np.int64))
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump({'rows': n, 'max_len': max_len, 'tokens': int(lengths.sum())}, f)
+
+    del input_ids, attention_mask
+    os.replace(tmp_path, path)
+
+def load_cache(path):
+    # mmap_mode='c' maps pages copy-on-write: writable (so torch.from_numpy
+    # accepts them without copying) while the file itself is never modified
+    return {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='c') for name in ARRAYS}
+
+def tokenized_cache(tokenizer, texts, labels, max_len, cache_dir=CACHE_DIR):
+    """Cache directory for (texts, labels), tokenizing only on a cache miss."""
+    path = os.path.join(cache_dir, cache_key(tokenizer, texts, labels, max_len))
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        print(f"Using tokenized cache {path}")
+    else:
+        print(f"Tokenizing {len(texts)} samples into {path}...")
+        os.makedirs(cache_dir, exist_ok=True)
+        build_cache(tokenizer, texts, labels, max_len, path)
+    return path
+
+def tokenized_arrays(tokenizer, texts, labels, max_len, cache_dir=CACHE_DIR):
+    return load_cache(tokenized_cache(tokenizer, texts, labels, max_len, cache_dir))
+
+if __name__ == "__main__":
+    import pandas as pd
+    from transformers import AutoTokenizer
+
+    from label_config import build_label_map
+    from train_biobert import DATA_PATH, MAX_LEN, MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="Pre-tokenize a training CSV into the dataset cache")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--model', default=MODEL_NAME)
+    parser.add_argument('--max-len', type=int, default=MAX_LEN)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    label_map = build_label_map(df['disease'])
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    arrays = tokenized_arrays(tokenizer, df['symptoms'].astype(str).tolist(),
+                              df['disease'].map(label_map).tolist(), args.max_len)
+    print(f"{len(arrays['labels'])} rows, mean length {arrays['lengths'].mean():.1f} tokens")
@@ -0,0 +1,191 @@
+import os
+import sqlite3
+import threading
+
+# Database setup
+DB_NAME = os.environ.get('DATABASE_PATH', 'medical_data.db')
+# Where the database lived before DATABASE_PATH was honoured; the shipped
+# .env.example points elsewhere, so init_db copies this file over once
+LEGACY_DB_NAME = 'medical_data.db'
+
+# Per-connection tuning. WAL lets readers run alongside a writer and
+# synchronous=NORMAL only fsyncs at checkpoints, which is safe in WAL mode.
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-8000',      # ~8MB page cache
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA busy_timeout=5000'
+)
+# Compiled statements kept per connection (sqlite3's prepared statement cache)
+STATEMENT_CACHE_SIZE = 64
+
+# SQL is kept as module constants so every call hits the statement cache
+SQL_UPSERT_PATIENT = '''
+    INSERT OR REPLACE INTO patients (id, name, age, gender, contact)
+    VALUES (?, ?, ?, ?, ?)
+'''
+SQL_INSERT_DIAGNOSIS = '''
+    INSERT INTO diagnosis_history (patient_id, symptoms, diagnosis, confidence)
+    VALUES (?, ?, ?, ?)
+'''
+# Keyset pagination: newest first, (timestamp, id) breaks ties between rows
+# written in the same second. Both queries are served by idx_history_patient_ts.
+SQL_SELECT_HISTORY = '''
+    SELECT id, diagnosis, confidence, timestamp
+    FROM diagnosis_history
+    WHERE patient_id = ?
+    ORDER BY timestamp DESC, id DESC
+    LIMIT ?
+'''
+SQL_SELECT_HISTORY_BEFORE = '''
+    SELECT id, diagnosis, confidence, timestamp
+    FROM diagnosis_history
+    WHERE patient_id = ? AND (timestamp, id) < (?, ?)
+    ORDER BY timestamp DESC, id DESC
+    LIMIT ?
+'''
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version
+MIGRATIONS = [
+    # 1: composite index for per-patient history lookups
+    '''
+    CREATE INDEX IF NOT EXISTS idx_history_patient_ts
+    ON diagnosis_history (patient_id, timestamp, id)
+    ''',
+]
+
+_local = threading.local()
+
+def _connect():
+    directory = os.path.dirname(DB_NAME)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    conn = sqlite3.connect(DB_NAME, timeout=5.0, cached_statements=STATEMENT_CACHE_SIZE)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def get_connection():
+    """Return this thread's pooled connection, opening it on first use.
+
+    Connections are never shared between threads, and a connection inherited
+    through fork (e.g. gunicorn workers) is discarded and reopened.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.pid != os.getpid():
+        conn = _connect()
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+def close_connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid():
+        conn.close()
+    _local.conn = None
+
+def _import_legacy_db():
+    """Copy the pre-DATABASE_PATH database to DB_NAME if DB_NAME does not exist yet."""
+    if (os.path.abspath(DB_NAME) == os.path.abspath(LEGACY_DB_NAME)
+            or os.path.exists(DB_NAME) or not os.path.exists(LEGACY_DB_NAME)):
+        return
+    print(f"Copying existing database {LEGACY_DB_NAME} to {DB_NAME} (DATABASE_PATH); "
+          f"the old file is left in place")
+    source = sqlite3.connect(LEGACY_DB_NAME)
+    target = _connect()
+    # The backup API also picks up rows still in the source's WAL file
+    source.backup(target)
+    target.close()
+    source.close()
+
+def init_db():
+    _import_legacy_db()
+    # Use a throwaway connection so nothing is left in the pool before fork
+    conn = _connect()
+    c = conn.cursor()
+
+    # Patients table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS patients (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            age INTEGER,
+            gender TEXT,
+            contact TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Diagnosis history table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS diagnosis_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_id TEXT,
+            symptoms TEXT,
+            diagnosis TEXT,
+            confidence REAL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (patient_id) REFERENCES patients (id)
+        )
+    ''')
+
+    conn.commit()
+    migrate(conn)
+    conn.close()
+
+def migrate(conn):
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for number, sql in enumerate(MIGRATIONS[version:], start=version + 1):
+        print(f"Applying database migration {number}...")
+        with conn:
+            conn.execute(sql)
+            conn.execute(f'PRAGMA user_version = {number}')
+
+def upsert_patient(patient_id, name, age, gender, contact=''):
+    conn = get_connection()
+    with conn:
+        conn.execute(SQL_UPSERT_PATIENT, (patient_id, name, age, gender, contact))
+
+def add_diagnoses(rows):
+    """Insert many (patient_id, symptoms, diagnosis, confidence) rows in one transaction."""
+    conn = get_connection()
+    with conn:
+        conn.executemany(SQL_INSERT_DIAGNOSIS, rows)
+
+def encode_cursor(timestamp, row_id):
+    return f"{timestamp}|{row_id}"
+
+def decode_cursor(cursor):
+    timestamp, sep, row_id = cursor.rpartition('|')
+    if not sep or not timestamp:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return timestamp, int(row_id)
+
+def get_history(patient_id, limit=50, before=None):
+    """Return one page of a patient's history, newest first.
+
+    ``before`` is the ``next_cursor`` of the previous page. Returns
+    ``(history, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    conn = get_connection()
+    # Fetch one extra row to know whether another page exists
+    if before:
+        timestamp, row_id = decode_cursor(before)
+        rows = conn.execute(SQL_SELECT_HISTORY_BEFORE, (patient_id, timestamp, row_id, limit + 1)).fetchall()
+    else:
+        rows = conn.execute(SQL_SELECT_HISTORY, (patient_id, limit + 1)).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[3], last[0])
+
+    history = [{
+        'diagnosis': r[1],
+        'confidence': r[2],
+        'date': r[3]
+    } for r in rows]
+    return history, next_cursor
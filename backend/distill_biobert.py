@@ -0,0 +1,271 @@
+"""
+Distill the fine-tuned BioBERT into a smaller student for CPU serving.
+
+The student keeps the teacher's tokenizer, hidden size and head, with fewer
+encoder layers, initialized from evenly spaced teacher layers (as in
+DistilBERT). It trains on the teacher's temperature-softened logits plus the
+hard labels, over the same tokenized cache train_biobert.py uses.
+
+The student is saved in the model/ layout BioBERTDiagnosis loads; serve it
+with MODEL_PATH=model/biobert_student. distillation_report.json compares
+teacher and student accuracy, single-request latency and memory.
+
+Usage: python distill_biobert.py [--layers 4] [--temperature 2.0] [--alpha 0.5]
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch.optim import AdamW
+from transformers import AutoModelForSequenceClassification, AutoTokenizer, get_linear_schedule_with_warmup
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from dataset_cache import tokenized_cache
+from label_config import LABEL_MAP_FILE, LabelConfig, save_label_map
+from test_model_performance import percentiles
+from train_biobert import (
+    BATCH_SIZE, DATA_PATH, MAX_LEN, OUTPUT_DIR, SEED, WARMUP_RATIO,
+    DiagnosisDataset, collate_trimmed, configure_threads, evaluate, make_loader
+)
+
+TEACHER_DIR = OUTPUT_DIR
+STUDENT_DIR = "model/biobert_student"
+REPORT_PATH = "distillation_report.json"
+STUDENT_LAYERS = 4
+TEMPERATURE = 2.0
+# Weight of the soft-target loss; the rest goes to cross-entropy on the labels
+ALPHA = 0.5
+EPOCHS = 3
+LEARNING_RATE = 5e-5
+LATENCY_SAMPLES = 200
+# Files that make up a saved model for the size comparison; exports,
+# quantized artifacts and training checkpoints next to it are left out
+MODEL_FILE_PATTERNS = ('*.safetensors', 'pytorch_model*.bin', '*.json', 'vocab.txt')
+
+_LAYER_KEY = re.compile(r"^(.*\.layer\.)(\d+)(\..*)$")
+
+class DistillDataset(DiagnosisDataset):
+    """DiagnosisDataset rows plus the teacher's logits for each row."""
+    def __init__(self, cache_path, indices, teacher_logits):
+        super().__init__(cache_path, indices)
+        self.teacher_logits = teacher_logits
+
+    def __getitem__(self, item):
+        sample = super().__getitem__(item)
+        sample['teacher_logits'] = torch.from_numpy(self.teacher_logits[self.indices[item]])
+        return sample
+
+def collate_distill(samples):
+    batch = collate_trimmed(samples)
+    batch['teacher_logits'] = torch.stack([s['teacher_logits'] for s in samples])
+    return batch
+
+def build_student(teacher, num_layers):
+    """Teacher architecture with num_layers encoder layers, copied from evenly spaced teacher layers."""
+    config = teacher.config.to_dict()
+    teacher_layers = config['num_hidden_layers']
+    num_layers = min(num_layers, teacher_layers)
+    config['num_hidden_layers'] = num_layers
+    student = AutoModelForSequenceClassification.from_config(type(teacher.config).from_dict(config))
+
+    keep = np.linspace(0, teacher_layers - 1, num_layers).round().astype(int).tolist()
+    state = {}
+    for key, value in teacher.state_dict().items():
+        match = _LAYER_KEY.match(key)
+        if match is None:
+            state[key] = value
+        elif int(match.group(2)) in keep:
+            state[f"{match.group(1)}{keep.index(int(match.group(2)))}{match.group(3)}"] = value
+    student.load_state_dict(state)
+    print(f"Student: {num_layers}/{teacher_layers} layers, initialized from teacher layers {keep}")
+    return student
+
+@torch.no_grad()
+def teacher_logits(teacher, cache_path, num_rows, batch_size, workers, device):
+    """Teacher logits for every row of the cache, computed once before training."""
+    teacher.eval()
+    loader = make_loader(DiagnosisDataset(cache_path, np.arange(num_rows)), batch_size, workers)
+    logits = []
+    for batch in loader:
+        outputs = teacher(input_ids=batch['input_ids'].to(device),
+                          attention_mask=batch['attention_mask'].to(device))
+        logits.append(outputs.logits.float().cpu().numpy())
+    return np.concatenate(logits)
+
+def distillation_loss(student_logits, teacher_logits, labels, temperature, alpha):
+    """alpha * T^2 * KL(teacher || student) at temperature T + (1 - alpha) * CE(labels).
+
+    The T^2 factor keeps soft-target gradients on the same scale as the hard loss.
+    """
+    soft = F.kl_div(
+        F.log_softmax(student_logits / temperature, dim=-1),
+        F.softmax(teacher_logits / temperature, dim=-1),
+        reduction='batchmean'
+    ) * temperature ** 2
+    hard = F.cross_entropy(student_logits, labels)
+    return alpha * soft + (1 - alpha) * hard
+
+def distill_epoch(student, loader, optimizer, scheduler, device, temperature, alpha):
+    student.train()
+    total_loss = 0.0
+    for batch in loader:
+        outputs = student(input_ids=batch['input_ids'].to(device),
+                          attention_mask=batch['attention_mask'].to(device))
+        loss = distillation_loss(outputs.logits, batch['teacher_logits'].to(device),
+                                 batch['labels'].to(device), temperature, alpha)
+        loss.backward()
+        optimizer.step()
+        scheduler.step()
+        optimizer.zero_grad()
+        total_loss += loss.item()
+    return total_loss / max(len(loader), 1)
+
+@torch.no_grad()
+def single_request_latency(model, tokenizer, texts):
+    """Per-text latency in ms on CPU with batch size 1, as a request is served."""
+    model.eval()
+    model.to("cpu")
+    # Warm up allocator and kernels before timing
+    for text in texts[:5]:
+        model(**tokenizer(text, truncation=True, max_length=MAX_LEN, return_tensors="pt"))
+    times = []
+    for text in texts:
+        started = time.perf_counter()
+        model(**tokenizer(text, truncation=True, max_length=MAX_LEN, return_tensors="pt"))
+        times.append((time.perf_counter() - started) * 1000)
+    return percentiles(times)
+
+def model_memory(model, model_dir):
+    param_bytes = sum(t.numel() * t.element_size() for t in list(model.parameters()) + list(model.buffers()))
+    files = {path for pattern in MODEL_FILE_PATTERNS for path in glob.glob(os.path.join(model_dir, pattern))}
+    disk_bytes = sum(os.path.getsize(path) for path in files)
+    return {
+        'parameters': sum(p.numel() for p in model.parameters()),
+        'weights_mb': round(param_bytes / 2 ** 20, 2),
+        'disk_mb': round(disk_bytes / 2 ** 20, 2)
+    }
+
+def distill(args):
+    if not os.path.isdir(args.teacher):
+        print(f"Error: teacher model {args.teacher} not found. Run train_biobert.py first.")
+        return
+    if not os.path.exists(args.data):
+        print(f"Error: {args.data} not found.")
+        return
+
+    torch.manual_seed(SEED)
+    threads = configure_threads(args.threads, args.workers)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    label_config = LabelConfig.from_dir(args.teacher)
+    label_map = {label: i for i, label in enumerate(label_config.labels)}
+    tokenizer = AutoTokenizer.from_pretrained(args.teacher)
+    teacher = AutoModelForSequenceClassification.from_pretrained(args.teacher, **label_config.config_kwargs()).to(device)
+
+    df = pd.read_csv(args.data)
+    unknown = ~df['disease'].isin(label_map)
+    if unknown.any():
+        print(f"Skipping {int(unknown.sum())} rows with labels the teacher does not know")
+        df = df[~unknown].reset_index(drop=True)
+
+    cache_path = tokenized_cache(
+        tokenizer,
+        df['symptoms'].astype(str).tolist(),
+        df['disease'].map(label_map).tolist(),
+        MAX_LEN
+    )
+    # Same split as train_biobert.py, so validation rows are unseen by both models
+    train_idx, val_idx = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+
+    print("Computing teacher logits...")
+    soft_targets = teacher_logits(teacher, cache_path, len(df), args.batch_size, args.workers, device)
+
+    student = build_student(teacher, args.layers).to(device)
+    train_loader = make_loader(DistillDataset(cache_path, train_idx, soft_targets), args.batch_size, args.workers,
+                               shuffle=True, generator=torch.Generator().manual_seed(SEED),
+                               collate_fn=collate_distill)
+    val_loader = make_loader(DiagnosisDataset(cache_path, val_idx), args.batch_size, args.workers)
+
+    optimizer = AdamW(student.parameters(), lr=LEARNING_RATE)
+    total_steps = len(train_loader) * args.epochs
+    scheduler = get_linear_schedule_with_warmup(optimizer, int(total_steps * WARMUP_RATIO), total_steps)
+
+    print(f"Config: device={device} threads={threads} layers={args.layers} "
+          f"temperature={args.temperature} alpha={args.alpha}")
+    os.makedirs(args.output, exist_ok=True)
+    best_val_loss = float('inf')
+    for epoch in range(args.epochs):
+        started = time.perf_counter()
+        train_loss = distill_epoch(student, train_loader, optimizer, scheduler, device,
+                                   args.temperature, args.alpha)
+        val_loss, val_acc = evaluate(student, val_loader, device, False)
+        print(f"Epoch {epoch+1}/{args.epochs} - Distillation Loss: {train_loss:.4f} - "
+              f"Validation Loss: {val_loss:.4f} - Accuracy: {val_acc:.2%} - {time.perf_counter() - started:.1f}s")
+        if val_loss < best_val_loss:
+            best_val_loss = val_loss
+            student.save_pretrained(args.output)
+
+    # Tokenizer and label map travel with the student so it loads like the teacher
+    tokenizer.model_max_length = MAX_LEN
+    tokenizer.save_pretrained(args.output)
+    if os.path.exists(os.path.join(args.teacher, LABEL_MAP_FILE)):
+        shutil.copy(os.path.join(args.teacher, LABEL_MAP_FILE), args.output)
+    else:
+        save_label_map(args.output, label_map)
+    print(f"Student saved to {args.output}")
+
+    student = AutoModelForSequenceClassification.from_pretrained(args.output).to(device)
+    latency_texts = df['symptoms'].astype(str).iloc[val_idx[:args.latency_samples]].tolist()
+    report = {'data': args.data, 'validation_rows': len(val_idx), 'models': {}}
+    for name, model, model_dir in (('teacher', teacher, args.teacher), ('student', student, args.output)):
+        model.to(device)
+        val_loss, val_acc = evaluate(model, val_loader, device, False)
+        report['models'][name] = {
+            'path': model_dir,
+            'layers': model.config.num_hidden_layers,
+            'accuracy': round(val_acc, 4),
+            'validation_loss': round(val_loss, 4),
+            'latency_ms': single_request_latency(model, tokenizer, latency_texts),
+            'memory': model_memory(model, model_dir)
+        }
+
+    teacher_report, student_report = report['models']['teacher'], report['models']['student']
+    if student_report['latency_ms'].get('p50'):
+        report['speedup_p50'] = round(teacher_report['latency_ms']['p50'] / student_report['latency_ms']['p50'], 2)
+    report['weights_ratio'] = round(student_report['memory']['weights_mb'] / teacher_report['memory']['weights_mb'], 3)
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    for name, entry in report['models'].items():
+        print(f"{name:8s} accuracy {entry['accuracy']:.2%} | p50 {entry['latency_ms'].get('p50')} ms "
+              f"p99 {entry['latency_ms'].get('p99')} ms | weights {entry['memory']['weights_mb']} MB")
+    print(f"Report written to {args.report}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Distill the fine-tuned BioBERT into a smaller student")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--teacher', default=TEACHER_DIR)
+    parser.add_argument('--output', default=STUDENT_DIR)
+    parser.add_argument('--report', default=REPORT_PATH)
+    parser.add_argument('--layers', type=int, default=STUDENT_LAYERS, help="Student encoder layers")
+    parser.add_argument('--temperature', type=float, default=TEMPERATURE)
+    parser.add_argument('--alpha', type=float, default=ALPHA, help="Weight of the soft-target loss")
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=0, help="DataLoader worker processes")
+    parser.add_argument('--threads', type=int, default=0, help="Intra-op threads (0 = CPU count minus workers)")
+    parser.add_argument('--latency-samples', type=int, default=LATENCY_SAMPLES,
+                        help="Validation texts timed one at a time for the latency report")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    distill(parse_args())
@@ -1,40 +1,210 @@
+"""
+Dataset augmentation.
 
+Streams the input CSV in chunks and augments each chunk in a process pool.
+Every variant is produced by its own RNG seeded from (seed, row, variant)
+and rows are written in (source row, variant) order, so the output - rows
+and their order - does not depend on chunk size or worker count. Operators:
+synonym substitution from a small symptom lexicon, token dropout and word
+shuffling. Rows are deduplicated by a hash of (symptoms, disease) and
+appended to the output (.csv, or .parquet with pyarrow) as chunks complete.
+
+Usage: python expand_dataset.py [--variants 3] [--workers 4] [--output data/expanded_training_data.csv]
+"""
+
+import argparse
+import hashlib
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-import random
 
-# Simple augmentation by shuffling words and adding noise
-def augment_text(text):
-    words = text.split()
-    if len(words) > 3:
-        random.shuffle(words)
+INPUT_FILE = 'data/training_data.csv'
+OUTPUT_FILE = 'data/expanded_training_data.csv'
+VARIANTS = 3
+CHUNK_ROWS = 10000
+SEED = 42
+
+SYNONYM_PROB = 0.5
+DROPOUT_PROB = 0.1
+SHUFFLE_PROB = 0.5
+# Dropout and shuffling only apply to texts with more words than this
+MIN_WORDS = 3
+
+# Interchangeable symptom phrasings, grouped by meaning
+SYMPTOM_SYNONYMS = [
+    ['fever', 'high temperature', 'pyrexia'],
+    ['headache', 'head pain'],
+    ['vomiting', 'throwing up', 'emesis'],
+    ['nausea', 'queasiness', 'feeling sick'],
+    ['diarrhea', 'loose stools', 'watery stools'],
+    ['cough', 'coughing'],
+    ['breathlessness', 'shortness of breath', 'difficulty breathing'],
+    ['fatigue', 'tiredness', 'exhaustion', 'weakness'],
+    ['chills', 'shivering', 'rigors'],
+    ['sweating', 'perspiration'],
+    ['rash', 'skin eruption'],
+    ['itching', 'itchiness', 'pruritus'],
+    ['joint pain', 'arthralgia', 'aching joints'],
+    ['muscle pain', 'body ache', 'myalgia'],
+    ['abdominal pain', 'stomach pain', 'belly pain'],
+    ['chest pain', 'chest discomfort'],
+    ['dizziness', 'lightheadedness', 'vertigo'],
+    ['sore throat', 'throat pain'],
+    ['runny nose', 'nasal discharge'],
+    ['loss of appetite', 'poor appetite'],
+    ['frequent urination', 'polyuria'],
+    ['excessive thirst', 'polydipsia'],
+    # No disease names here: swapping one in would leak the label into the text
+    ['yellow eyes', 'yellowing of eyes'],
+]
+
+_SYNONYMS = {phrase: [p for p in group if p != phrase] for group in SYMPTOM_SYNONYMS for phrase in group}
+# Chunks submitted ahead of the writer, per worker
+WINDOW_PER_WORKER = 2
+
+# Longest phrases first so "chest pain" wins over "pain"
+_SYNONYM_PATTERN = re.compile(
+    r'\b(' + '|'.join(re.escape(p) for p in sorted(_SYNONYMS, key=len, reverse=True)) + r')\b'
+)
+
+def substitute_synonyms(text, rng, prob=SYNONYM_PROB):
+    def replace(match):
+        if rng.random() >= prob:
+            return match.group(0)
+        options = _SYNONYMS[match.group(0)]
+        return options[rng.integers(len(options))]
+    return _SYNONYM_PATTERN.sub(replace, text)
+
+def drop_tokens(words, rng, prob=DROPOUT_PROB):
+    if len(words) <= MIN_WORDS:
+        return words
+    keep = rng.random(len(words)) >= prob
+    # Never drop below MIN_WORDS
+    if keep.sum() < MIN_WORDS:
+        return words
+    return [w for w, k in zip(words, keep) if k]
+
+def augment_text(text, rng):
+    words = substitute_synonyms(text.lower(), rng).split()
+    words = drop_tokens(words, rng)
+    if len(words) > MIN_WORDS and rng.random() < SHUFFLE_PROB:
+        words = [words[i] for i in rng.permutation(len(words))]
     return ' '.join(words)
 
-def expand_dataset():
-    input_file = 'data/training_data.csv'
-    output_file = 'data/expanded_training_data.csv'
-    
+def augment_chunk(chunk, start_row, variants, seed):
+    """Each row followed by its `variants` augmentations, in source row order.
+
+    Row numbers are global and each row's variants directly follow it, so
+    concatenating chunk results gives the same rows in the same order
+    however the input is split.
+    """
+    texts = chunk['symptoms'].astype(str).to_numpy()
+    diseases = chunk['disease'].to_numpy()
+
+    symptoms = []
+    labels = []
+    for offset, (text, disease) in enumerate(zip(texts, diseases)):
+        symptoms.append(text)
+        labels.append(disease)
+        for variant in range(variants):
+            rng = np.random.default_rng([seed, start_row + offset, variant])
+            symptoms.append(augment_text(text, rng))
+            labels.append(disease)
+    return pd.DataFrame({'symptoms': symptoms, 'disease': labels})
+
+def row_hashes(df):
+    keys = (df['symptoms'].str.lower().str.split().str.join(' ') + '\x1f' + df['disease'].astype(str))
+    return [hashlib.blake2b(k.encode(), digest_size=8).digest() for k in keys]
+
+class ChunkWriter:
+    """Appends DataFrames to a CSV, or to a Parquet file when the path ends in .parquet."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self._writer = None
+        self.rows = 0
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a', header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def _augment_job(args):
+    return augment_chunk(*args)
+
+def expand_dataset(input_file=INPUT_FILE, output_file=OUTPUT_FILE, variants=VARIANTS,
+                   workers=None, chunk_rows=CHUNK_ROWS, seed=SEED):
     try:
-        df = pd.read_csv(input_file)
-        print(f"Original dataset size: {len(df)}")
-        
-        new_rows = []
-        for _, row in df.iterrows():
-            # Create 3 variations for each existing row
-            for _ in range(3):
-                new_rows.append({
-                    'symptoms': augment_text(row['symptoms']),
-                    'disease': row['disease']
-                })
-        
-        augmented_df = pd.DataFrame(new_rows)
-        final_df = pd.concat([df, augmented_df], ignore_index=True)
-        
-        print(f"Expanded dataset size: {len(final_df)}")
-        final_df.to_csv(output_file, index=False)
+        def jobs():
+            start_row = 0
+            for chunk in pd.read_csv(input_file, chunksize=chunk_rows):
+                yield chunk, start_row, variants, seed
+                start_row += len(chunk)
+
+        seen = set()
+        read_rows = 0
+        duplicates = 0
+        workers = workers or os.cpu_count() or 1
+        writer = ChunkWriter(output_file)
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # Executor.map would read and submit every chunk up front; a
+                # bounded window of futures keeps memory flat, and taking
+                # results in submission order keeps the output deterministic
+                pending = deque()
+                chunks = jobs()
+                for job in chunks:
+                    pending.append(pool.submit(_augment_job, job))
+                    if len(pending) >= WINDOW_PER_WORKER * workers:
+                        break
+                while pending:
+                    result = pending.popleft().result()
+                    job = next(chunks, None)
+                    if job is not None:
+                        pending.append(pool.submit(_augment_job, job))
+
+                    read_rows += len(result) // (variants + 1)
+                    keep = []
+                    for h in row_hashes(result):
+                        keep.append(h not in seen)
+                        seen.add(h)
+                    duplicates += len(keep) - sum(keep)
+                    writer.write(result[keep])
+        finally:
+            writer.close()
+
+        print(f"Original dataset size: {read_rows}")
+        print(f"Expanded dataset size: {writer.rows} ({duplicates} duplicates dropped)")
         print(f"Saved to {output_file}")
-        
+
     except Exception as e:
         print(f"Error expanding dataset: {e}")
 
 if __name__ == "__main__":
-    expand_dataset()
+    parser = argparse.ArgumentParser(description="Augment the symptom dataset")
+    parser.add_argument('--input', default=INPUT_FILE)
+    parser.add_argument('--output', default=OUTPUT_FILE, help=".csv or .parquet (needs pyarrow)")
+    parser.add_argument('--variants', type=int, default=VARIANTS, help="Augmented copies per row")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--seed', type=int, default=SEED)
+    args = parser.parse_args()
+    expand_dataset(args.input, args.output, args.variants, args.workers, args.chunk_rows, args.seed)
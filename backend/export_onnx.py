@@ -0,0 +1,95 @@
+"""
+Export the fine-tuned classifier to ONNX and check parity with PyTorch.
+
+Usage: python export_onnx.py [--model-dir model/biobert_finetuned] [--quantize]
+
+Writes model.onnx (and model.int8.onnx with --quantize) into the model
+directory, where INFERENCE_BACKEND=onnx picks it up.
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+from model_files import record_source
+from onnx_backend import OnnxBackend, onnx_model_path
+
+DATA_PATH = "data/training_data.csv"
+INPUT_NAMES = ['input_ids', 'attention_mask', 'token_type_ids']
+
+def export(model, tokenizer, path, opset):
+    sample = tokenizer(["fever and headache", "cough"], return_tensors="pt", padding=True)
+    input_names = [name for name in INPUT_NAMES if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['logits'] = {0: 'batch'}
+
+    torch.onnx.export(
+        model,
+        tuple(sample[name] for name in input_names),
+        path,
+        input_names=input_names,
+        output_names=['logits'],
+        dynamic_axes=dynamic_axes,
+        opset_version=opset,
+        do_constant_folding=True,
+        dynamo=False
+    )
+
+def quantize(path, output_path):
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(path, output_path, weight_type=QuantType.QInt8)
+
+def check_parity(model, tokenizer, model_dir, quantization, texts, tolerance):
+    inputs = tokenizer(texts, return_tensors="np", padding=True, truncation=True, max_length=128)
+
+    with torch.no_grad():
+        reference = model(**{k: torch.from_numpy(v) for k, v in inputs.items()}).logits.numpy()
+    logits = OnnxBackend(model_dir, quantization=quantization).logits(dict(inputs))
+
+    max_diff = float(np.abs(reference - logits).max())
+    agreement = float(np.mean(reference.argmax(axis=1) == logits.argmax(axis=1)))
+    print(f"[{quantization}] max |logit diff| = {max_diff:.2e}, argmax agreement = {agreement * 100:.2f}% "
+          f"({len(texts)} samples)")
+    return max_diff <= tolerance and agreement == 1.0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the classifier to ONNX")
+    parser.add_argument('--model-dir', default="model/biobert_finetuned")
+    parser.add_argument('--opset', type=int, default=17)
+    parser.add_argument('--quantize', action='store_true',
+                        help="Also write a dynamic INT8 quantized model.int8.onnx")
+    parser.add_argument('--tolerance', type=float, default=1e-3,
+                        help="Max allowed absolute logit difference for the fp32 export")
+    parser.add_argument('--samples', type=int, default=64, help="Rows of the dataset to check parity on")
+    args = parser.parse_args()
+
+    print(f"Loading {args.model_dir}...")
+    tokenizer = AutoTokenizer.from_pretrained(args.model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(args.model_dir)
+    model.eval()
+
+    path = onnx_model_path(args.model_dir)
+    export(model, tokenizer, path, args.opset)
+    record_source(path, args.model_dir)
+    print(f"Exported {path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+
+    texts = pd.read_csv(DATA_PATH)['symptoms'].astype(str).tolist()[:args.samples]
+    ok = check_parity(model, tokenizer, args.model_dir, 'none', texts, args.tolerance)
+
+    if args.quantize:
+        int8_path = onnx_model_path(args.model_dir, 'int8')
+        quantize(path, int8_path)
+        record_source(int8_path, args.model_dir)
+        print(f"Exported {int8_path} ({os.path.getsize(int8_path) / (1024 * 1024):.1f} MB)")
+        # INT8 logits drift by design; only report them
+        check_parity(model, tokenizer, args.model_dir, 'int8', texts, float('inf'))
+
+    if not ok:
+        print("Parity check FAILED")
+        sys.exit(1)
+    print("Parity check passed")
@@ -0,0 +1,26 @@
+"""
+Gunicorn settings, picked up automatically by `gunicorn app:app` from this directory.
+
+With MODEL_PRELOAD=true the app (and the BioBERT weights) is imported once in
+the master before workers are forked. Workers then share the weight pages
+copy-on-write instead of each holding a private copy.
+"""
+
+import gc
+import os
+import sys
+
+preload_app = os.environ.get('MODEL_PRELOAD', 'False').lower() in ('1', 'true', 'yes')
+
+def when_ready(server):
+    if preload_app:
+        # Move everything allocated so far out of the GC's reach; otherwise the
+        # first collection in each worker touches every object header and
+        # un-shares the pages
+        gc.collect()
+        gc.freeze()
+
+def post_fork(server, worker):
+    inference = sys.modules.get('inference')
+    if inference is not None:
+        inference.model_loader.after_fork()
@@ -0,0 +1,127 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+import db
+from metrics import Counter
+
+FLUSH_RETRIES = 3
+
+class HistoryWriter:
+    """Write-behind queue for diagnosis_history rows.
+
+    Rows are queued by the request thread and inserted by a background thread
+    in batched transactions, flushed when ``flush_size`` rows are pending or
+    ``flush_interval_ms`` has passed. If the queue is full the row is written
+    synchronously instead, so records are never dropped for lack of space.
+    """
+
+    def __init__(self, flush_size=100, flush_interval_ms=200, max_queue=10000):
+        self.flush_size = max(1, int(flush_size))
+        self.flush_interval = max(1.0, float(flush_interval_ms)) / 1000.0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        # Rows taken off the queue by the writer thread but not yet committed
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        self.last_flush = None
+        self.flushes = Counter()
+        self.rows_written = Counter()
+        self.sync_writes = Counter()
+        self.errors = Counter()
+        self.dropped = Counter()
+
+    def add(self, row):
+        self.add_many([row])
+
+    def add_many(self, rows):
+        self._ensure_started()
+        for i, row in enumerate(rows):
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                # Backpressure: write the remainder on the caller's thread
+                self.sync_writes.inc(len(rows) - i)
+                db.add_diagnoses(rows[i:])
+                return
+
+    @property
+    def queue_depth(self):
+        """Rows accepted but not yet written: queued plus the batch being collected or flushed."""
+        return self._queue.qsize() + self._pending
+
+    def stop(self, timeout=10):
+        """Flush everything still queued and stop the writer thread."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def stats(self):
+        return {
+            'enabled': True,
+            'queue_depth': self.queue_depth,
+            'last_flush': self.last_flush,
+            'flushes': self.flushes.value,
+            'rows_written': self.rows_written.value,
+            'sync_writes': self.sync_writes.value,
+            'errors': self.errors.value,
+            'dropped': self.dropped.value
+        }
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so (re)start lazily in each process
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._thread.start()
+
+    def _flush(self, rows):
+        for attempt in range(1, FLUSH_RETRIES + 1):
+            try:
+                db.add_diagnoses(rows)
+                self.flushes.inc()
+                self.rows_written.inc(len(rows))
+                self.last_flush = datetime.now(timezone.utc).isoformat()
+                return
+            except Exception as e:
+                self.errors.inc()
+                print(f"History flush failed (attempt {attempt}/{FLUSH_RETRIES}): {e}")
+                time.sleep(0.05 * attempt)
+        self.dropped.inc(len(rows))
+        print(f"Dropped {len(rows)} history rows after {FLUSH_RETRIES} failed flushes")
+
+    def _run(self):
+        pending = []
+        deadline = None
+        stopping = False
+        while not stopping:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                row = self._queue.get(timeout=timeout)
+                if row is None:
+                    stopping = True
+                else:
+                    pending.append(row)
+                    self._pending = len(pending)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+            except queue.Empty:
+                pass
+
+            if pending and (stopping or len(pending) >= self.flush_size or time.monotonic() >= deadline):
+                self._flush(pending)
+                pending = []
+                self._pending = 0
+                deadline = None
+
+        db.close_connection()
@@ -1,114 +1,329 @@
-
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import numpy as np
+import hashlib
 import os
+import threading
+import time
+
+from label_config import LabelConfig
+from linear_model import LINEAR_MODEL_DIR, LinearModel, linear_model_path
+from lexicon import BOOST_MAX_CONFIDENCE, BOOST_MIN_CONFIDENCE, SymptomLexicon
+from metrics import timed
+from model_files import file_digest, source_fingerprint
+from tokenization import FastTokenizer, group_by_bucket, length_buckets
+
+# 'torch' runs the model with PyTorch; 'onnx' runs an export from export_onnx.py
+# with ONNX Runtime and the tokenizers library, so torch and transformers do not
+# need to be installed; 'linear' runs the hashed n-gram classifier from
+# train_linear.py with NumPy alone
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'torch').lower()
+
+# 'none' serves the fp32 model; 'int8' applies dynamic INT8 quantization to the
+# Linear layers (CPU only), using a pre-quantized artifact if one was saved
+MODEL_QUANTIZATION = os.environ.get('MODEL_QUANTIZATION', 'none').lower()
+
+# Fine-tuned model directory; e.g. model/biobert_student for the distilled
+# model from distill_biobert.py
+MODEL_PATH = os.environ.get('MODEL_PATH', 'model/biobert_finetuned')
+
+# Candidates kept per prediction
+TOP_K = 3
+
+# Confidence of keyword-boosted results. 'deterministic' derives it from the
+# model probability and keyword match strength, so equal inputs give equal
+# results (needed for caching and batch/single parity). 'random' is the old
+# demo behaviour, a uniform draw, seeded with CONFIDENCE_SEED if set.
+CONFIDENCE_MODE = os.environ.get('CONFIDENCE_MODE', 'deterministic').lower()
+CONFIDENCE_SEED = os.environ.get('CONFIDENCE_SEED')
+
+# Import the runtime up front: if it is missing the app falls back to offline mode
+if INFERENCE_BACKEND == 'onnx':
+    from onnx_backend import OnnxBackend
+elif INFERENCE_BACKEND != 'linear':
+    try:
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    except ImportError:
+        # requirements-lite installs: serve the linear model if one was trained
+        if not os.path.exists(linear_model_path()):
+            raise
+        print("PyTorch not installed, using the linear model")
+        INFERENCE_BACKEND = 'linear'
+
+class TorchBackend:
+    def __init__(self, model_name, label_config, quantization='none'):
+        # Head shape and label names come from the artifact's label config
+        config_kwargs = label_config.config_kwargs()
+        if quantization == 'int8':
+            # Quantized kernels run on CPU only
+            self.device = torch.device("cpu")
+            self.model = self._load_quantized_model(model_name, config_kwargs)
+        else:
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            self.model = AutoModelForSequenceClassification.from_pretrained(model_name, **config_kwargs)
+        self.model.to(self.device)
+
+    def _load_quantized_model(self, model_name, config_kwargs):
+        from quantization import quantize_dynamic_int8, load_quantized, quantized_artifact_path, has_current_quantized
+
+        if has_current_quantized(model_name):
+            print("Loading pre-quantized INT8 weights...")
+            return load_quantized(model_name, **config_kwargs)
+        if os.path.exists(quantized_artifact_path(model_name)):
+            print("⚠️ Pre-quantized INT8 weights were built from a different model; "
+                  "re-run quantization.py to refresh them")
+
+        print("Applying dynamic INT8 quantization...")
+        model = AutoModelForSequenceClassification.from_pretrained(model_name, **config_kwargs)
+        return quantize_dynamic_int8(model)
+
+    def logits(self, inputs):
+        tensors = {k: torch.from_numpy(v).to(self.device) for k, v in inputs.items()}
+        with torch.no_grad():
+            return self.model(**tensors).logits.float().cpu().numpy()
 
 class BioBERTDiagnosis:
     def __init__(self):
-        self.finetuned_path = "model/biobert_finetuned"
+        self.backend = None
+        self.load_error = None
+        self.version = None
+        # Keyword rules, compiled once
+        self.lexicon = SymptomLexicon.load()
+        self.rng = np.random.default_rng(int(CONFIDENCE_SEED) if CONFIDENCE_SEED else None)
+        self.finetuned_path = MODEL_PATH
         self.base_model = "dmis-lab/biobert-v1.1"
         
         try:
-            if os.path.exists(self.finetuned_path):
+            if INFERENCE_BACKEND == 'linear':
+                print(f"Loading linear model from {LINEAR_MODEL_DIR}...")
+                self.model_name = LINEAR_MODEL_DIR
+            elif os.path.exists(self.finetuned_path):
                 print(f"Loading fine-tuned model from {self.finetuned_path}...")
                 self.model_name = self.finetuned_path
             else:
                 print(f"Fine-tuned model not found. Loading base model {self.base_model}...")
                 self.model_name = self.base_model
 
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self.model = AutoModelForSequenceClassification.from_pretrained(
-                self.model_name, 
-                num_labels=15,
-                problem_type="multi_label_classification"
-            )
-            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            self.model.to(self.device)
-            print("BioBERT model loaded successfully!")
+            self.label_config = LabelConfig.from_dir(self.model_name)
+            self.labels = self.label_config.labels
+
+            if INFERENCE_BACKEND == 'linear':
+                # Featurizes raw text itself; no tokenizer or length buckets
+                self.tokenizer = None
+                self.backend = LinearModel.load(self.model_name)
+            elif INFERENCE_BACKEND == 'onnx':
+                self.tokenizer = FastTokenizer.from_dir(self.model_name)
+                self.backend = OnnxBackend(self.model_name, quantization=MODEL_QUANTIZATION)
+            else:
+                self.tokenizer = FastTokenizer.from_transformers(AutoTokenizer.from_pretrained(self.model_name))
+                self.backend = TorchBackend(self.model_name, self.label_config, quantization=MODEL_QUANTIZATION)
+
+            # Truncate at the training-time length and pad batches per length bucket
+            self.max_length = self.tokenizer.model_max_length if self.tokenizer else None
+            self.buckets = length_buckets(self.max_length) if self.tokenizer else None
+            self.version = self._loaded_version()
+            print(f"BioBERT model loaded successfully! (backend={INFERENCE_BACKEND}, "
+                  f"quantization={MODEL_QUANTIZATION}, max_length={self.max_length}, "
+                  f"labels={self.label_config.num_labels}, problem_type={self.label_config.problem_type})")
+
+            # Lexicon disease -> model label index ("Diabetes" -> "Diabetes Type 2")
+            label_keys = [label.lower() for label in self.labels]
+            self.boost_label_index = {}
+            for disease in self.lexicon.diseases:
+                matches = [i for i, key in enumerate(label_keys) if key.startswith(disease.lower())]
+                if matches:
+                    self.boost_label_index[disease] = matches[0]
         except Exception as e:
             print(f"Error loading BioBERT: {e}")
-            self.model = None
-
-        # Disease labels mapping (matching our frontend/offline logic)
-        self.labels = [
-            'Malaria', 'Dengue', 'Typhoid', 'Tuberculosis', 'Pneumonia',
-            'Common Cold', 'Acute Gastroenteritis', 'Diabetes Type 2',
-            'Hypertension', 'Anemia', 'Jaundice', 'Acid Reflux',
-            'Appendicitis', 'Viral Fever', 'Fungal Infection'
-        ]
+            self.backend = None
+            self.load_error = str(e)
 
     def predict(self, symptoms_text):
-        if not self.model:
-            return self._fallback_rule_based(symptoms_text)
+        return self.predict_batch([symptoms_text])[0]
+
+    def predict_batch(self, texts):
+        texts = list(texts)
+        if not self.backend:
+            return [self._fallback_rule_based(t) for t in texts]
 
         try:
-            # Tokenize
-            inputs = self.tokenizer(
-                symptoms_text, 
-                return_tensors="pt", 
-                truncation=True, 
-                padding=True, 
-                max_length=512
-            ).to(self.device)
-
-            # Inference
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                logits = outputs.logits
-                probs = torch.sigmoid(logits).cpu().numpy()[0]
-
-            # Get top predictions
-            results = []
-            for i, prob in enumerate(probs):
-                results.append({
-                    'disease': self.labels[i],
-                    'confidence': float(prob)
-                })
-            
-            # Sort by confidence
-            results.sort(key=lambda x: x['confidence'], reverse=True)
-            
-            # For the hackathon demo with a base model, we might get low confidence.
-            # Let's boost the top result if it matches keywords to ensure a good demo.
-            top_result = results[0]
-            boosted_result = self._apply_keyword_boost(symptoms_text, top_result)
-            
-            return boosted_result
+            logits = self.forward(texts)
+            with timed('postprocess'):
+                probs = self.label_config.probabilities(logits)
+                # Top-k for the whole batch at once
+                top_idx, top_probs = self.label_config.top_k(probs, TOP_K)
+
+                return [
+                    self._postprocess(text, self.labels[idx], p, row)
+                    for text, idx, p, row in zip(texts, top_idx, top_probs, probs)
+                ]
 
         except Exception as e:
             print(f"Prediction error: {e}")
-            return self._fallback_rule_based(symptoms_text)
+            return [self._fallback_rule_based(t) for t in texts]
+
+    def forward(self, texts):
+        """Logits for texts: tokenize the batch once, then one forward pass per length bucket."""
+        if self.tokenizer is None:
+            # Featurization is part of the linear model's forward
+            with timed('forward'):
+                return self.backend.logits(texts)
+
+        with timed('tokenize'):
+            ids = self.tokenizer.encode(texts, self.max_length)
+        logits = None
+        with timed('forward'):
+            for indices in group_by_bucket(ids, self.buckets).values():
+                # Pad to the longest input in the bucket, which is at most the bucket width
+                group = [ids[i] for i in indices]
+                inputs = self.tokenizer.pack(group, max(len(row) for row in group))
+                bucket_logits = self.backend.logits(inputs)
+                if logits is None:
+                    logits = np.empty((len(texts), bucket_logits.shape[1]), dtype=np.float32)
+                logits[indices] = bucket_logits
+        return logits
+
+    def _postprocess(self, symptoms_text, labels, probs, all_probs):
+        # labels/probs are the top-k candidates, best first
+        results = [
+            {'disease': label, 'confidence': float(prob)}
+            for label, prob in zip(labels, probs)
+        ]
+
+        # For the hackathon demo with a base model, we might get low confidence.
+        # Let's boost the top result if it matches keywords to ensure a good demo.
+        top_result = results[0]
+        prediction = self._apply_keyword_boost(symptoms_text, top_result, all_probs)
+        # Keep the model's own top-k distribution for differential diagnoses
+        return dict(prediction, differential=results)
 
-    def _apply_keyword_boost(self, text, top_result):
-        text = text.lower()
+    def _apply_keyword_boost(self, text, top_result, probs):
         # Simple keyword matching to ensure the "AI" agrees with obvious symptoms
-        # This helps since we are using a base model without fine-tuning data
-        keywords = {
-            'malaria': ['chills', 'shivering', 'sweating'],
-            'dengue': ['joint pain', 'rash', 'eye pain'],
-            'pneumonia': ['chest pain', 'breath', 'phlegm'],
-            'diabetes': ['thirst', 'urination', 'sugar'],
-            'jaundice': ['yellow', 'pale stool'],
-            'typhoid': ['abdominal', 'constipation']
-        }
+        # This helps since we are using a base model without fine-tuning data.
+        # The first disease in lexicon order with a matching term wins.
+        for disease, terms in self.lexicon.disease_hits(text).items():
+            # If symptoms match a disease, ensure it's high confidence
+            return {
+                'disease': disease + " (BioBERT Detected)",
+                'confidence': self._boost_confidence(disease, terms, probs)
+            }
 
-        for disease, keys in keywords.items():
-            if any(k in text for k in keys):
-                # If symptoms match a disease, ensure it's high confidence
-                return {
-                    'disease': disease.title() + " (BioBERT Detected)",
-                    'confidence': 0.85 + (np.random.random() * 0.1) # 0.85 - 0.95
-                }
-        
         # Return original if no boost
         return top_result
 
+    def _boost_confidence(self, disease, terms, probs):
+        """Confidence in [BOOST_MIN_CONFIDENCE, BOOST_MAX_CONFIDENCE] for a keyword match.
+
+        Deterministic mode averages the match strength (share of the disease's
+        lexicon terms found) with the model's probability for that disease,
+        and never reports less than the model itself.
+        """
+        span = BOOST_MAX_CONFIDENCE - BOOST_MIN_CONFIDENCE
+        if CONFIDENCE_MODE == 'random':
+            return BOOST_MIN_CONFIDENCE + self.rng.random() * span
+
+        strength = self.lexicon.match_strength(disease, terms)
+        index = self.boost_label_index.get(disease)
+        model_prob = float(probs[index]) if index is not None else 0.0
+        return max(BOOST_MIN_CONFIDENCE + span * (strength + model_prob) / 2, model_prob)
+
+    def _loaded_version(self):
+        """Short hash identifying the weights this instance loaded, computed once at load."""
+        if INFERENCE_BACKEND == 'linear':
+            weights = file_digest(linear_model_path(self.model_name))
+        elif INFERENCE_BACKEND == 'onnx':
+            weights = file_digest(self.backend.path)
+        else:
+            # Hub models have no local checkpoint; their name identifies them
+            weights = source_fingerprint(self.model_name) or self.model_name
+        identity = f"{INFERENCE_BACKEND}:{MODEL_QUANTIZATION}:{weights}"
+        return hashlib.sha1(identity.encode()).hexdigest()[:12]
+
+    def model_fingerprint(self):
+        """Version of the model in memory, used to key cached results.
+
+        Fixed for the life of the instance: files changing on disk (a retrain,
+        a new export) do not change what this process serves until it reloads.
+        """
+        return self.version
+
     def _fallback_rule_based(self, text):
         return {
             'disease': 'Viral Fever (Rule-based)',
-            'confidence': 0.75
+            'confidence': 0.75,
+            'fallback': True
+        }
+
+class ModelLoader:
+    """Builds the BioBERTDiagnosis singleton on demand and tracks its readiness.
+
+    state goes 'idle' -> 'loading' -> 'ready', or 'failed' if the weights could
+    not be loaded (the model then answers with its rule-based fallback).
+
+    Under gunicorn --preload the master loads synchronously before forking, so
+    workers share the weight pages copy-on-write; otherwise each process loads
+    in a background thread while the server already accepts requests.
+    """
+
+    def __init__(self):
+        self.state = 'idle'
+        self.model = None
+        self.error = None
+        self.load_seconds = None
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+
+    def start(self, background=True):
+        with self._lock:
+            if self.state != 'idle':
+                return
+            self.state = 'loading'
+
+        if background:
+            threading.Thread(target=self._load, name='model-loader', daemon=True).start()
+        else:
+            self._load()
+
+    def load(self):
+        """Load synchronously (or wait for an in-flight load) and return the model."""
+        self.start(background=False)
+        self._loaded.wait()
+        return self.model
+
+    @property
+    def is_loaded(self):
+        return self._loaded.is_set()
+
+    def after_fork(self):
+        # Runtime state such as thread pools does not survive fork
+        backend = self.model.backend if self.model else None
+        if backend is not None and hasattr(backend, 'after_fork'):
+            backend.after_fork()
+
+    def status(self):
+        return {
+            'state': self.state,
+            'error': self.error,
+            'load_seconds': self.load_seconds,
+            'backend': INFERENCE_BACKEND
         }
 
-# Singleton instance
-biobert = BioBERTDiagnosis()
+    def _load(self):
+        started = time.monotonic()
+        try:
+            model = BioBERTDiagnosis()
+            self.model = model
+            if model.backend is None:
+                self.state = 'failed'
+                self.error = model.load_error
+            else:
+                self.state = 'ready'
+        except Exception as e:
+            print(f"Error loading BioBERT: {e}")
+            self.state = 'failed'
+            self.error = str(e)
+        finally:
+            self.load_seconds = round(time.monotonic() - started, 3)
+            self._loaded.set()
+
+# Singleton loader; call model_loader.start() or model_loader.load()
+model_loader = ModelLoader()
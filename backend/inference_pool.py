@@ -0,0 +1,111 @@
+import contextlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Counter, Histogram, LATENCY_MS_BUCKETS
+
+class PoolFull(Exception):
+    """Raised when the inference pool has no free worker or queue slot."""
+
+class InferencePool:
+    """Bounded thread pool that runs model work off the request threads.
+
+    At most ``max_workers`` calls run at once and ``max_queue`` more may
+    wait; past that ``run`` raises PoolFull right away instead of queueing,
+    so request threads never pile up behind inference and cheap requests
+    (health, history, static files) keep being served. Threads work here
+    because the forward pass releases the GIL.
+
+    Work that runs on another thread (the micro-batcher) goes through
+    ``admitted`` instead: it takes a slot, so it counts against the same
+    limit, but no worker, so batches are not capped at ``max_workers``.
+    """
+
+    def __init__(self, max_workers=2, max_queue=8):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._in_flight = 0
+
+        self.completed = Counter()
+        self.rejected = Counter()
+        self.errors = Counter()
+        self.wait_ms = Histogram(LATENCY_MS_BUCKETS)
+        self.run_ms = Histogram(LATENCY_MS_BUCKETS)
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def run(self, fn, *args):
+        """Run fn(*args) on the pool and wait for its result."""
+        self._admit()
+        try:
+            future = self._ensure_started().submit(self._call, fn, args, time.monotonic())
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future.result()
+
+    @contextlib.contextmanager
+    def admitted(self):
+        """Hold a slot, without a worker, while the caller waits on work run elsewhere."""
+        self._admit()
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _admit(self):
+        if not self._slots.acquire(blocking=False):
+            self.rejected.inc()
+            raise PoolFull(f"Inference queue full ({self.max_workers} running, {self.max_queue} waiting)")
+        with self._lock:
+            self._in_flight += 1
+
+    def _call(self, fn, args, enqueued):
+        started = time.monotonic()
+        self.wait_ms.observe((started - enqueued) * 1000)
+        try:
+            return fn(*args)
+        except Exception:
+            self.errors.inc()
+            raise
+        finally:
+            self.run_ms.observe((time.monotonic() - started) * 1000)
+            self.completed.inc()
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so create the executor lazily in each process
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='inference')
+            return self._executor
+
+    def stop(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=True)
+
+    def stats(self):
+        return {
+            'enabled': True,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'in_flight': self._in_flight,
+            'completed': self.completed.value,
+            'rejected': self.rejected.value,
+            'errors': self.errors.value,
+            'queue_wait_ms': self.wait_ms.snapshot(),
+            'run_ms': self.run_ms.snapshot()
+        }
@@ -0,0 +1,93 @@
+import json
+import os
+
+import numpy as np
+
+LABEL_MAP_FILE = "label_map.json"
+
+# Labels of the original demo head, used when a model directory carries no
+# label information (e.g. the untuned base model)
+DEFAULT_LABELS = [
+    'Malaria', 'Dengue', 'Typhoid', 'Tuberculosis', 'Pneumonia',
+    'Common Cold', 'Acute Gastroenteritis', 'Diabetes Type 2',
+    'Hypertension', 'Anemia', 'Jaundice', 'Acid Reflux',
+    'Appendicitis', 'Viral Fever', 'Fungal Infection'
+]
+
+SINGLE_LABEL = "single_label_classification"
+MULTI_LABEL = "multi_label_classification"
+
+def build_label_map(diseases):
+    """Label -> id, sorted by name so ids do not depend on row order."""
+    return {label: i for i, label in enumerate(sorted(set(diseases)))}
+
+def save_label_map(model_dir, label_map):
+    with open(os.path.join(model_dir, LABEL_MAP_FILE), 'w') as f:
+        json.dump(label_map, f)
+
+class LabelConfig:
+    """Index -> label array and output activation of a classifier head.
+
+    Read with plain json (no transformers needed) from the model directory:
+    id2label in config.json when it holds real names, else label_map.json
+    written by train_biobert.py.
+    """
+
+    def __init__(self, labels, problem_type=SINGLE_LABEL):
+        self.labels = np.array(labels, dtype=object)
+        self.problem_type = problem_type
+
+    @property
+    def num_labels(self):
+        return len(self.labels)
+
+    @classmethod
+    def from_dir(cls, model_dir):
+        config = {}
+        config_path = os.path.join(model_dir, "config.json")
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                config = json.load(f)
+        # Training uses cross-entropy, which transformers records as single-label
+        problem_type = config.get('problem_type') or SINGLE_LABEL
+
+        id2label = config.get('id2label') or {}
+        if id2label and not all(v == f"LABEL_{k}" for k, v in id2label.items()):
+            return cls([id2label[str(i)] for i in range(len(id2label))], problem_type)
+
+        label_map_path = os.path.join(model_dir, LABEL_MAP_FILE)
+        if os.path.exists(label_map_path):
+            with open(label_map_path) as f:
+                label_map = json.load(f)
+            return cls(sorted(label_map, key=label_map.get), problem_type)
+
+        # No trained head: keep the legacy multi-label demo behaviour
+        return cls(DEFAULT_LABELS, MULTI_LABEL)
+
+    def config_kwargs(self):
+        """Overrides for from_pretrained so the loaded head matches this config."""
+        return {
+            'num_labels': self.num_labels,
+            'id2label': {i: label for i, label in enumerate(self.labels)},
+            'label2id': {label: i for i, label in enumerate(self.labels)},
+            'problem_type': self.problem_type
+        }
+
+    def probabilities(self, logits):
+        """Softmax over labels for single-label heads, per-label sigmoid for multi-label."""
+        if self.problem_type == MULTI_LABEL:
+            return 1.0 / (1.0 + np.exp(-logits))
+        shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return shifted / shifted.sum(axis=1, keepdims=True)
+
+    def top_k(self, probs, k):
+        """(indices, probabilities) of the k most likely labels per row, best first.
+
+        argpartition selects the k columns in linear time; only those k are sorted.
+        """
+        k = min(k, probs.shape[1])
+        rows = np.arange(len(probs))[:, None]
+        top = np.argpartition(-probs, k - 1, axis=1)[:, :k]
+        order = np.argsort(-probs[rows, top], axis=1)
+        top = top[rows, order]
+        return top, probs[rows, top]
@@ -0,0 +1,98 @@
+"""
+Symptom lexicon shared by the server and the PWA's offline engine.
+
+data/symptom_lexicon.json maps disease names (used for the keyword boost)
+and symptom categories (used by the offline rules in frontend/app.js) to
+lists of terms. The terms are compiled once into a single regex that finds
+every occurrence in one pass over the text.
+
+Usage: python lexicon.py [--export ../frontend/symptom_lexicon.json]
+Copies the lexicon next to the frontend so the offline engine loads the
+identical rules.
+"""
+
+import argparse
+import json
+import os
+import re
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+LEXICON_PATH = os.path.join(BACKEND_DIR, 'data', 'symptom_lexicon.json')
+FRONTEND_EXPORT_PATH = os.path.join(BACKEND_DIR, '..', 'frontend', 'symptom_lexicon.json')
+
+# Confidence range reported for keyword-matched diagnoses
+BOOST_MIN_CONFIDENCE = 0.85
+BOOST_MAX_CONFIDENCE = 0.95
+
+class SymptomLexicon:
+    """Compiled multi-term matcher over the lexicon.
+
+    Matching is case-insensitive substring matching, like the original
+    ``any(k in text for k in keys)`` checks: "breath" also hits "breathing".
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.diseases = data.get('diseases', {})
+        self.categories = data.get('categories', {})
+
+        # term -> disease names / category names it belongs to
+        self._term_diseases = {}
+        self._term_categories = {}
+        for name, terms in self.diseases.items():
+            for term in terms:
+                self._term_diseases.setdefault(term.lower(), []).append(name)
+        for name, terms in self.categories.items():
+            for term in terms:
+                self._term_categories.setdefault(term.lower(), []).append(name)
+
+        terms = sorted(set(self._term_diseases) | set(self._term_categories), key=len, reverse=True)
+        # A zero-width lookahead tries every start position, so overlapping
+        # terms are all found; alternation order picks the longest term at
+        # each position and _prefixes adds the shorter ones starting there
+        self._pattern = re.compile('(?=(' + '|'.join(re.escape(t) for t in terms) + '))')
+        self._prefixes = {t: [p for p in terms if p != t and t.startswith(p)] for t in terms}
+
+    @classmethod
+    def load(cls, path=LEXICON_PATH):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def match(self, text):
+        """Set of all lexicon terms occurring in text."""
+        found = set()
+        for m in self._pattern.finditer(text.lower()):
+            term = m.group(1)
+            found.add(term)
+            found.update(self._prefixes[term])
+        return found
+
+    def matched_categories(self, text):
+        return {c for t in self.match(text) for c in self._term_categories.get(t, ())}
+
+    def disease_hits(self, text):
+        """{disease: matched terms}, in lexicon order."""
+        terms = self.match(text)
+        hits = {}
+        for term in terms:
+            for disease in self._term_diseases.get(term, ()):
+                hits.setdefault(disease, []).append(term)
+        return {d: sorted(hits[d]) for d in self.diseases if d in hits}
+
+    def match_strength(self, disease, terms):
+        """Share of the disease's lexicon terms that were matched, 0-1."""
+        return len(terms) / len(self.diseases[disease])
+
+def export_lexicon(path=FRONTEND_EXPORT_PATH, source=LEXICON_PATH):
+    with open(source, encoding='utf-8') as f:
+        data = json.load(f)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the symptom lexicon for the PWA")
+    parser.add_argument('--export', default=FRONTEND_EXPORT_PATH, help="Destination JSON file")
+    args = parser.parse_args()
+    print(f"Lexicon written to {os.path.normpath(export_lexicon(args.export))}")
@@ -0,0 +1,118 @@
+"""
+Hashed n-gram features and a linear classifier, in NumPy only.
+
+Used by train_linear.py to train and by the 'linear' inference backend to
+serve when torch is not installed (the requirements-lite deployment).
+"""
+
+import json
+import os
+import re
+import zlib
+
+import numpy as np
+
+LINEAR_MODEL_DIR = "model/linear"
+WEIGHTS_FILE = "linear_model.npz"
+
+N_FEATURES = 2 ** 18
+CHAR_NGRAM = 3
+
+_WORD = re.compile(r"\w+")
+
+def linear_model_path(model_dir=LINEAR_MODEL_DIR):
+    return os.path.join(model_dir, WEIGHTS_FILE)
+
+class HashedNgramVectorizer:
+    """Word unigrams, word bigrams and character trigrams hashed into n_features buckets.
+
+    crc32 keeps bucket ids stable across processes and Python versions.
+    Rows are log-scaled term frequency times idf, L2 normalized, returned as
+    CSR arrays (indptr, indices, data).
+    """
+
+    def __init__(self, n_features=N_FEATURES, char_ngram=CHAR_NGRAM, idf=None):
+        self.n_features = n_features
+        self.char_ngram = char_ngram
+        self.idf = idf
+
+    def grams(self, text):
+        words = _WORD.findall(text.lower())
+        grams = [f"w:{w}" for w in words]
+        grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        n = self.char_ngram
+        for w in words:
+            padded = f"<{w}>"
+            grams += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+        return grams
+
+    def buckets(self, text):
+        return np.array([zlib.crc32(g.encode()) % self.n_features for g in self.grams(text)], dtype=np.int64)
+
+    def fit_idf(self, texts):
+        df = np.zeros(self.n_features, dtype=np.float64)
+        for text in texts:
+            df[np.unique(self.buckets(text))] += 1
+        # Smoothed idf, as in scikit-learn's TfidfTransformer
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def transform(self, texts):
+        indptr = [0]
+        indices = []
+        data = []
+        for text in texts:
+            ids, counts = np.unique(self.buckets(text), return_counts=True)
+            values = (1 + np.log(counts)).astype(np.float32)
+            if self.idf is not None:
+                values *= self.idf[ids]
+            norm = np.linalg.norm(values)
+            if norm:
+                values /= norm
+            indices.append(ids)
+            data.append(values)
+            indptr.append(indptr[-1] + len(ids))
+        return (
+            np.array(indptr, dtype=np.int64),
+            np.concatenate(indices) if indices else np.empty(0, dtype=np.int64),
+            np.concatenate(data) if data else np.empty(0, dtype=np.float32)
+        )
+
+def sparse_dot(indptr, indices, data, weights, bias):
+    """(rows x n_features CSR) @ weights + bias, only touching the non-zero columns."""
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    out = np.tile(bias, (len(indptr) - 1, 1))
+    np.add.at(out, rows, weights[indices] * data[:, None])
+    return out
+
+class LinearModel:
+    def __init__(self, weights, bias, vectorizer):
+        self.weights = weights
+        self.bias = bias
+        self.vectorizer = vectorizer
+
+    @classmethod
+    def load(cls, model_dir=LINEAR_MODEL_DIR):
+        with open(os.path.join(model_dir, "config.json")) as f:
+            config = json.load(f)
+        arrays = np.load(linear_model_path(model_dir))
+        vectorizer = HashedNgramVectorizer(config['n_features'], config['char_ngram'], arrays['idf'])
+        return cls(arrays['weights'], arrays['bias'], vectorizer)
+
+    def save(self, model_dir, labels):
+        os.makedirs(model_dir, exist_ok=True)
+        np.savez_compressed(linear_model_path(model_dir), weights=self.weights, bias=self.bias,
+                            idf=self.vectorizer.idf)
+        # Same id2label layout as a transformers config, so LabelConfig reads it
+        config = {
+            'model_type': 'hashed_ngram_linear',
+            'n_features': self.vectorizer.n_features,
+            'char_ngram': self.vectorizer.char_ngram,
+            'problem_type': 'single_label_classification',
+            'id2label': {str(i): label for i, label in enumerate(labels)}
+        }
+        with open(os.path.join(model_dir, "config.json"), 'w') as f:
+            json.dump(config, f, indent=2)
+
+    def logits(self, texts):
+        return sparse_dot(*self.vectorizer.transform(texts), self.weights, self.bias)
@@ -0,0 +1,123 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Default histogram buckets for batch sizes (requests per forward pass)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# Default histogram buckets for latencies in milliseconds
+LATENCY_MS_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+class Counter:
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        # Cumulative counts, Prometheus style
+        cumulative = {}
+        running = 0
+        for bound, c in zip(list(self.buckets) + ['+Inf'], counts):
+            running += c
+            cumulative[str(bound)] = running
+
+        return {
+            'count': count,
+            'sum': round(total, 6),
+            'mean': round(total / count, 6) if count else 0.0,
+            'buckets': cumulative
+        }
+
+# Stages of the diagnose hot path. tokenize, forward and postprocess are
+# observed once per model call (one batch); db_write and serialize once per request.
+STAGES = ('tokenize', 'forward', 'postprocess', 'db_write', 'serialize')
+stage_latency_ms = {stage: Histogram(LATENCY_MS_BUCKETS) for stage in STAGES}
+
+@contextmanager
+def timed(stage):
+    """Record the duration of the block in the stage's latency histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_latency_ms[stage].observe((time.perf_counter() - started) * 1000)
+
+def _number(value):
+    # ints exactly; floats with repr, since '%g' rounds to 6 significant digits
+    if isinstance(value, (bool, int)):
+        return str(int(value))
+    return repr(float(value))
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+class PrometheusWriter:
+    """Builds a Prometheus text exposition (format 0.0.4) page."""
+
+    def __init__(self, prefix='medassist_'):
+        self.prefix = prefix
+        self._lines = []
+
+    def metric(self, name, kind, help_text, samples):
+        """samples: value, or a list of (labels dict, value)."""
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        name = self.prefix + name
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self._lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def counter(self, name, help_text, samples):
+        self.metric(name, 'counter', help_text, samples)
+
+    def gauge(self, name, help_text, samples):
+        self.metric(name, 'gauge', help_text, samples)
+
+    def histogram(self, name, help_text, samples):
+        """samples: Histogram, or a list of (labels dict, Histogram)."""
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        name = self.prefix + name
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in samples:
+            snapshot = histogram.snapshot()
+            for bound, count in snapshot['buckets'].items():
+                self._lines.append(f"{name}_bucket{_labels(dict(labels, le=bound))} {count}")
+            self._lines.append(f"{name}_sum{_labels(labels)} {_number(snapshot['sum'])}")
+            self._lines.append(f"{name}_count{_labels(labels)} {_number(snapshot['count'])}")
+
+    def text(self):
+        return '\n'.join(self._lines) + '\n'
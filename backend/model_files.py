@@ -0,0 +1,53 @@
+import glob
+import hashlib
+import os
+
+# Files a fine-tuned checkpoint is made of (save_pretrained, possibly sharded)
+SOURCE_PATTERNS = ('config.json', 'model*.safetensors', 'pytorch_model*.bin')
+# Derived artifacts (quantized weights, ONNX exports) record the checkpoint
+# they were built from in a sidecar file next to them
+SOURCE_SUFFIX = ".source"
+
+_READ_CHUNK = 1 << 20
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while chunk := f.read(_READ_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_fingerprint(model_dir):
+    """Content hash of the checkpoint files in model_dir, or None if there are none.
+
+    Hashes contents rather than mtimes so copying the directory (e.g. in a
+    deploy) does not change it.
+    """
+    paths = sorted({p for pattern in SOURCE_PATTERNS for p in glob.glob(os.path.join(model_dir, pattern))})
+    if not any(os.path.basename(p) != 'config.json' for p in paths):
+        return None
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(f"{os.path.basename(path)}:{file_digest(path)};".encode())
+    return digest.hexdigest()[:16]
+
+def record_source(artifact_path, model_dir):
+    """Store the fingerprint of the checkpoint artifact_path was built from."""
+    with open(artifact_path + SOURCE_SUFFIX, 'w') as f:
+        f.write(source_fingerprint(model_dir) or '')
+
+def is_stale(artifact_path, model_dir):
+    """True if artifact_path was built from a different checkpoint than the one in model_dir.
+
+    Artifacts without a recorded source count as stale. If the checkpoint
+    itself is not present (e.g. an ONNX-only deploy) there is nothing to
+    compare against and the artifact is trusted.
+    """
+    current = source_fingerprint(model_dir)
+    if current is None:
+        return False
+    try:
+        with open(artifact_path + SOURCE_SUFFIX) as f:
+            return f.read().strip() != current
+    except FileNotFoundError:
+        return True
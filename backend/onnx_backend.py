@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import onnxruntime as ort
+
+from model_files import is_stale
+
+ONNX_FILENAME = "model.onnx"
+ONNX_INT8_FILENAME = "model.int8.onnx"
+
+# Intra-op threads per session (0 = let ONNX Runtime decide)
+ONNX_THREADS = int(os.environ.get('ONNX_THREADS', 0))
+
+def onnx_model_path(model_dir, quantization='none'):
+    filename = ONNX_INT8_FILENAME if quantization == 'int8' else ONNX_FILENAME
+    return os.path.join(model_dir, filename)
+
+class OnnxBackend:
+    """Runs the exported classifier with ONNX Runtime on CPU.
+
+    Takes the same numpy tokenizer output as TorchBackend and returns logits
+    as a float32 array of shape (batch, num_labels).
+    """
+
+    def __init__(self, model_dir, quantization='none'):
+        path = onnx_model_path(model_dir, quantization)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found. Run export_onnx.py first.")
+        if is_stale(path, model_dir):
+            # Serving an export of older weights would silently disagree with the checkpoint
+            raise RuntimeError(f"{path} was exported from a different model. Re-run export_onnx.py.")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+
+        print(f"Loading ONNX model from {path}...")
+        self.path = path
+        self.options = options
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def after_fork(self):
+        # ONNX Runtime thread pools do not survive fork; rebuild the session
+        self.session = ort.InferenceSession(self.path, self.options, providers=['CPUExecutionProvider'])
+
+    def logits(self, inputs):
+        # The graph only declares the inputs it uses (e.g. no token_type_ids for some models)
+        feed = {name: inputs[name].astype(np.int64, copy=False) for name in self.input_names}
+        return self.session.run(['logits'], feed)[0]
@@ -0,0 +1,109 @@
+import collections
+import os
+import sys
+import threading
+import time
+
+from metrics import Counter
+
+# Threads doing model work on behalf of requests; their stacks are included
+# in every active request's samples (prefixed with the thread name)
+MODEL_THREAD_PREFIXES = ('inference', 'micro-batcher')
+
+def fold_stack(frame):
+    """Frame -> 'outer;...;inner' with one 'function (file:line)' entry per frame."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class SlowRequestProfiler:
+    """Sampling profiler that keeps stacks of requests slower than a threshold.
+
+    While at least one request is active, a background thread samples the
+    stacks of the request threads (and model worker threads) every
+    ``interval_ms``. When a request ends after ``threshold_ms`` or more, its
+    samples are written in folded-stack format ("frame;frame;frame count"),
+    which flamegraph.pl, speedscope and inferno read directly.
+    """
+
+    def __init__(self, threshold_ms, interval_ms=5, output_dir='profiles'):
+        self.threshold_ms = float(threshold_ms)
+        self.interval = max(1.0, float(interval_ms)) / 1000.0
+        self.output_dir = output_dir
+
+        self._active = {}
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        self.samples = Counter()
+        self.dumps = Counter()
+
+    def start_request(self):
+        self._ensure_started()
+        with self._lock:
+            self._active[threading.get_ident()] = collections.Counter()
+        self._wake.set()
+
+    def end_request(self, name, duration_ms):
+        """Stop sampling the current thread; returns the dump path for slow requests."""
+        with self._lock:
+            stacks = self._active.pop(threading.get_ident(), None)
+            if not self._active:
+                self._wake.clear()
+        if not stacks or duration_ms < self.threshold_ms:
+            return None
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.output_dir, f"{stamp}-{os.getpid()}-{name}-{round(duration_ms)}ms.folded")
+        with open(path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.dumps.inc()
+        return path
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so (re)start lazily in each process
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._active = {}
+                self._thread = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            # Idle until a request is active
+            self._wake.wait()
+            time.sleep(self.interval)
+
+            frames = sys._current_frames()
+            model_stacks = [
+                f"{t.name};{fold_stack(frames[t.ident])}"
+                for t in threading.enumerate()
+                if t.name.startswith(MODEL_THREAD_PREFIXES) and t.ident in frames
+            ]
+            with self._lock:
+                for ident, stacks in self._active.items():
+                    if ident in frames:
+                        stacks[f"request;{fold_stack(frames[ident])}"] += 1
+                    for stack in model_stacks:
+                        stacks[stack] += 1
+            self.samples.inc()
+
+    def stats(self):
+        return {
+            'enabled': True,
+            'threshold_ms': self.threshold_ms,
+            'interval_ms': round(self.interval * 1000, 3),
+            'output_dir': self.output_dir,
+            'samples': self.samples.value,
+            'dumps': self.dumps.value
+        }
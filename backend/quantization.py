@@ -0,0 +1,68 @@
+"""
+Dynamic INT8 quantization for CPU serving.
+Linear layers (where BERT spends most of its time) get int8 weights and
+dynamically quantized activations; embeddings and LayerNorm stay fp32.
+
+Usage: python quantization.py [model_dir]
+Writes a pre-quantized artifact next to the model so servers can skip the
+quantization step at load time. The artifact records which fine-tuned weights
+it was built from; servers ignore it once the model has been retrained.
+"""
+
+import os
+import sys
+
+import torch
+from transformers import AutoConfig, AutoModelForSequenceClassification
+
+from model_files import is_stale, record_source
+
+QUANTIZED_WEIGHTS = "quantized_int8.pt"
+
+def quantize_dynamic_int8(model):
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def quantized_artifact_path(model_dir):
+    return os.path.join(model_dir, QUANTIZED_WEIGHTS)
+
+def save_quantized(model, model_dir):
+    path = quantized_artifact_path(model_dir)
+    torch.save(model.state_dict(), path)
+    record_source(path, model_dir)
+    return path
+
+def has_current_quantized(model_dir):
+    """True if a pre-quantized artifact exists and was built from the weights now in model_dir."""
+    path = quantized_artifact_path(model_dir)
+    return os.path.exists(path) and not is_stale(path, model_dir)
+
+def load_quantized(model_dir, **config_kwargs):
+    """Rebuild the quantized module structure from config and load the saved int8 weights."""
+    config = AutoConfig.from_pretrained(model_dir, **config_kwargs)
+    model = quantize_dynamic_int8(AutoModelForSequenceClassification.from_config(config))
+    model.load_state_dict(torch.load(quantized_artifact_path(model_dir), weights_only=False))
+    model.eval()
+    return model
+
+def model_size_mb(model):
+    """Serialized state_dict size, a fair proxy for resident weight memory."""
+    total = 0
+    for value in model.state_dict().values():
+        if isinstance(value, torch.Tensor):
+            total += value.numel() * value.element_size()
+        elif isinstance(value, tuple):
+            # Packed quantized Linear params are stored as (weight, bias)
+            total += sum(t.numel() * t.element_size() for t in value if isinstance(t, torch.Tensor))
+    return total / (1024 * 1024)
+
+if __name__ == "__main__":
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else "model/biobert_finetuned"
+    print(f"Loading {model_dir}...")
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    print(f"fp32 weights: {model_size_mb(model):.1f} MB")
+
+    quantized = quantize_dynamic_int8(model)
+    path = save_quantized(quantized, model_dir)
+    print(f"int8 weights: {os.path.getsize(path) / (1024 * 1024):.1f} MB on disk")
+    print(f"Saved quantized model to {path}")
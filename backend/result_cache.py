@@ -0,0 +1,80 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import Counter
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+def normalize_symptoms(text):
+    """Cache key for a symptom string: lowercased, punctuation stripped, tokens sorted.
+
+    "Fever, Headache" and "headache fever" map to the same key, which is how
+    the frontend's symptom chips tend to combine.
+    """
+    return ' '.join(sorted(_PUNCTUATION.sub(' ', text.lower()).split()))
+
+def cache_key(model_version, text):
+    """Result cache key: the model version plus the normalized symptom string."""
+    return (model_version, normalize_symptoms(text))
+
+class ResultCache:
+    """Bounded LRU cache with a per-entry TTL.
+
+    Callers include the model version in the key (see ``cache_key``), so a
+    result is never served for a model other than the one that produced it.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl_seconds)
+
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+        self.hits = Counter()
+        self.misses = Counter()
+        self.evictions = Counter()
+        self.expirations = Counter()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits.inc()
+                    return value
+                del self._entries[key]
+                self.expirations.inc()
+        self.misses.inc()
+        return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions.inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        hits, misses = self.hits.value, self.misses.value
+        return {
+            'enabled': True,
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            'evictions': self.evictions.value,
+            'expirations': self.expirations.value
+        }
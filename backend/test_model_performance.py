@@ -1,59 +1,250 @@
-
 import torch
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 from sklearn.metrics import classification_report, confusion_matrix
 import pandas as pd
 import numpy as np
+import argparse
+import copy
+import json
+import os
+import time
+
+from tokenization import FastTokenizer
 
 MODEL_PATH = "model/biobert_finetuned"
 DATA_PATH = "data/training_data.csv"
+REPORT_PATH = "evaluation_report.json"
+
+EVAL_BATCH_SIZE = 32
+# Rows read from the CSV at a time; the file is never loaded whole
+CSV_CHUNK_ROWS = 4096
+CALIBRATION_BINS = 10
+
+def load_label_map():
+    with open(f"{MODEL_PATH}/label_map.json", 'r') as f:
+        return json.load(f)
+
+def count_rows(path):
+    with open(path, 'rb') as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+def iter_batches(path, batch_size, chunk_rows=CSV_CHUNK_ROWS):
+    """Yield (texts, diseases) batches while streaming the CSV in chunks."""
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        texts = chunk['symptoms'].astype(str).tolist()
+        diseases = chunk['disease'].tolist()
+        for start in range(0, len(texts), batch_size):
+            yield texts[start:start + batch_size], diseases[start:start + batch_size]
+
+def predict_stream(model, tokenizer, label_map, data_path, batch_size=EVAL_BATCH_SIZE):
+    """Batched forward passes over the CSV.
+
+    Logits, true label ids (-1 for labels the model does not know) and
+    per-batch timings are gathered into arrays preallocated from the row
+    count, so memory stays flat however large the file is.
+    """
+    n = count_rows(data_path)
+    num_labels = model.config.num_labels
+    logits = np.empty((n, num_labels), dtype=np.float32)
+    y_true = np.empty(n, dtype=np.int32)
+    max_batches = -(-n // batch_size) + n // CSV_CHUNK_ROWS + 1
+    batch_ms = np.empty(max_batches, dtype=np.float64)
+    batch_rows = np.empty(max_batches, dtype=np.int32)
+
+    fast_tokenizer = FastTokenizer.from_transformers(tokenizer)
+    model.eval()
+
+    row = 0
+    batches = 0
+    with torch.inference_mode():
+        for texts, diseases in iter_batches(data_path, batch_size):
+            start = time.perf_counter()
+            inputs = fast_tokenizer(texts)
+            outputs = model(**{k: torch.from_numpy(v) for k, v in inputs.items()})
+            end = row + len(texts)
+            logits[row:end] = outputs.logits.float().numpy()
+            batch_ms[batches] = (time.perf_counter() - start) * 1000
+            batch_rows[batches] = len(texts)
+            y_true[row:end] = [label_map.get(d, -1) for d in diseases]
+            row = end
+            batches += 1
+
+    return {
+        'logits': logits[:row],
+        'y_true': y_true[:row],
+        'batch_ms': batch_ms[:batches],
+        'batch_rows': batch_rows[:batches]
+    }
+
+def softmax(logits):
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+def calibration(confidence, correct, bins=CALIBRATION_BINS):
+    """Reliability table and expected calibration error for top-1 confidence."""
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    bin_ids = np.clip(np.digitize(confidence, edges[1:-1]), 0, bins - 1)
+    counts = np.bincount(bin_ids, minlength=bins)
+    conf_sum = np.bincount(bin_ids, weights=confidence, minlength=bins)
+    correct_sum = np.bincount(bin_ids, weights=correct, minlength=bins)
+
+    table = []
+    ece = 0.0
+    for i in range(bins):
+        if not counts[i]:
+            continue
+        mean_conf = conf_sum[i] / counts[i]
+        accuracy = correct_sum[i] / counts[i]
+        ece += counts[i] / len(confidence) * abs(mean_conf - accuracy)
+        table.append({
+            'range': [round(float(edges[i]), 2), round(float(edges[i + 1]), 2)],
+            'count': int(counts[i]),
+            'mean_confidence': round(float(mean_conf), 4),
+            'accuracy': round(float(accuracy), 4)
+        })
+    return {'ece': round(float(ece), 4), 'bins': table}
+
+def percentiles(values):
+    if not len(values):
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': round(float(p50), 3), 'p95': round(float(p95), 3), 'p99': round(float(p99), 3),
+            'mean': round(float(np.mean(values)), 3)}
+
+def build_report(result, label_map):
+    labels = sorted(label_map, key=label_map.get)
+    known = result['y_true'] >= 0
+    y_true = result['y_true'][known]
+    probs = softmax(result['logits'][known])
+    y_pred = probs.argmax(axis=1)
+    confidence = probs[np.arange(len(y_pred)), y_pred]
+    correct = (y_pred == y_true).astype(np.float64)
+
+    label_ids = list(range(len(labels)))
+    # Per-sample latency is the batch time spread over its rows
+    per_sample_ms = np.repeat(result['batch_ms'] / result['batch_rows'], result['batch_rows'])
+    total_seconds = result['batch_ms'].sum() / 1000
+
+    return {
+        'samples': int(len(result['y_true'])),
+        'unknown_labels': int((~known).sum()),
+        'accuracy': round(float(correct.mean()), 4) if len(correct) else None,
+        'classification_report': classification_report(
+            y_true, y_pred, labels=label_ids, target_names=labels, output_dict=True, zero_division=0
+        ),
+        'confusion_matrix': {
+            'labels': labels,
+            'matrix': confusion_matrix(y_true, y_pred, labels=label_ids).tolist()
+        },
+        'calibration': calibration(confidence, correct),
+        'latency_ms': {
+            'per_sample': percentiles(per_sample_ms),
+            'per_batch': percentiles(result['batch_ms'])
+        },
+        'throughput_samples_per_s': round(len(result['y_true']) / total_seconds, 1) if total_seconds else None
+    }
 
-def evaluate_model():
+def load_model():
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH)
+    model = AutoModelForSequenceClassification.from_pretrained(MODEL_PATH)
+    model.eval()
+    return tokenizer, model
+
+def evaluate_model(data_path=DATA_PATH, batch_size=EVAL_BATCH_SIZE, report_path=REPORT_PATH):
     try:
         print("Loading model for evaluation...")
-        tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH)
-        model = AutoModelForSequenceClassification.from_pretrained(MODEL_PATH)
-        
-        # Load labels
-        import json
-        with open(f"{MODEL_PATH}/label_map.json", 'r') as f:
-            label_map = json.load(f)
-        inv_label_map = {v: k for k, v in label_map.items()}
-        
-        # Load test data (using training data for demo purposes if no separate test set)
-        df = pd.read_csv(DATA_PATH)
-        
-        print("Running predictions...")
-        y_true = []
-        y_pred = []
-        
-        for _, row in df.iterrows():
-            text = row['symptoms']
-            true_label = row['disease']
-            
-            inputs = tokenizer(
-                text, 
-                return_tensors="pt", 
-                truncation=True, 
-                padding=True, 
-                max_length=128
-            )
-            
-            with torch.no_grad():
-                outputs = model(**inputs)
-                logits = outputs.logits
-                pred_idx = torch.argmax(logits, dim=1).item()
-                pred_label = inv_label_map[pred_idx]
-                
-            y_true.append(true_label)
-            y_pred.append(pred_label)
-            
+        tokenizer, model = load_model()
+        label_map = load_label_map()
+
+        # Using training data for demo purposes if no separate test set
+        print(f"Running batched predictions on {data_path} (batch size {batch_size})...")
+        result = predict_stream(model, tokenizer, label_map, data_path, batch_size)
+        report = build_report(result, label_map)
+        report.update(model_path=MODEL_PATH, data_path=data_path, batch_size=batch_size)
+
         print("\nClassification Report:")
-        print(classification_report(y_true, y_pred))
-        
+        y_known = result['y_true'] >= 0
+        print(classification_report(
+            result['y_true'][y_known], result['logits'][y_known].argmax(axis=1),
+            labels=list(range(len(label_map))), target_names=sorted(label_map, key=label_map.get),
+            zero_division=0
+        ))
+        latency = report['latency_ms']['per_sample']
+        print(f"Accuracy {report['accuracy']}, ECE {report['calibration']['ece']}, "
+              f"{report['throughput_samples_per_s']} samples/s, per-sample latency "
+              f"p50 {latency['p50']} ms / p95 {latency['p95']} ms / p99 {latency['p99']} ms")
+
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {report_path}")
+
     except Exception as e:
         print(f"Evaluation failed: {e}")
         print("Ensure you have trained the model first using train_biobert.py")
 
+def compare_quantization(data_path=DATA_PATH, batch_size=EVAL_BATCH_SIZE):
+    """Compare the fp32 model against its dynamic INT8 version on accuracy and latency."""
+    from quantization import (quantize_dynamic_int8, load_quantized, quantized_artifact_path,
+                              has_current_quantized, model_size_mb)
+
+    try:
+        tokenizer, fp32_model = load_model()
+
+        if has_current_quantized(MODEL_PATH):
+            print("Using saved pre-quantized artifact")
+            int8_model = load_quantized(MODEL_PATH)
+        else:
+            if os.path.exists(quantized_artifact_path(MODEL_PATH)):
+                print("⚠️ Saved pre-quantized artifact was built from a different model; ignoring it")
+            print("Quantizing in memory")
+            int8_model = quantize_dynamic_int8(copy.deepcopy(fp32_model))
+
+        label_map = load_label_map()
+
+        results = {}
+        for name, model in (('fp32', fp32_model), ('int8', int8_model)):
+            # Warm up so one-time allocation does not skew the percentiles
+            with torch.inference_mode():
+                model(**tokenizer(["fever and headache"] * batch_size, return_tensors="pt"))
+            result = predict_stream(model, tokenizer, label_map, data_path, batch_size)
+            report = build_report(result, label_map)
+            results[name] = {
+                'pred': result['logits'].argmax(axis=1),
+                'accuracy': report['accuracy'],
+                'p50': report['latency_ms']['per_sample']['p50'],
+                'p95': report['latency_ms']['per_sample']['p95'],
+                'size_mb': model_size_mb(model)
+            }
+
+        agreement = np.mean(results['fp32']['pred'] == results['int8']['pred'])
+
+        print(f"\n{'model':<6} | {'accuracy':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'weights MB':>10}")
+        print("-" * 52)
+        for name, r in results.items():
+            print(f"{name:<6} | {r['accuracy']:8.3f} | {r['p50']:8.2f} | {r['p95']:8.2f} | {r['size_mb']:10.1f}")
+        print(f"\nLabel agreement fp32 vs int8: {agreement * 100:.2f}% ({len(results['fp32']['pred'])} samples)")
+        if agreement < 1.0:
+            changed = np.flatnonzero(results['fp32']['pred'] != results['int8']['pred'])
+            texts = pd.read_csv(data_path, usecols=['symptoms'])['symptoms'].iloc[changed[:10]]
+            print("Samples with changed predictions:")
+            for text in texts:
+                print(f"  - {text}")
+
+    except Exception as e:
+        print(f"Comparison failed: {e}")
+        print("Ensure you have trained the model first using train_biobert.py")
+
 if __name__ == "__main__":
-    evaluate_model()
+    parser = argparse.ArgumentParser(description="Evaluate the fine-tuned BioBERT model")
+    parser.add_argument('--data', default=DATA_PATH, help="CSV with symptoms and disease columns")
+    parser.add_argument('--batch-size', type=int, default=EVAL_BATCH_SIZE,
+                        help="Rows per forward pass (1 measures single-request latency)")
+    parser.add_argument('--report', default=REPORT_PATH, help="Where to write the JSON report")
+    parser.add_argument('--compare-quantized', action='store_true',
+                        help="Compare fp32 and dynamic INT8 accuracy and latency")
+    args = parser.parse_args()
+
+    if args.compare_quantized:
+        compare_quantization(args.data, args.batch_size)
+    else:
+        evaluate_model(args.data, args.batch_size, args.report)
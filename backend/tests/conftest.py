@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+import types
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# db reads DATABASE_PATH at import, which may happen while tests are collected
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='api_test_'), 'test.db')
+
+@pytest.fixture(scope='session')
+def client():
+    """Flask test client on a scratch database with the benchmark's stub model."""
+    from benchmark_api import StubDiagnosis, StubLoader
+
+    inference = types.ModuleType('inference')
+    inference.model_loader = StubLoader(StubDiagnosis())
+    sys.modules['inference'] = inference
+
+    import app
+    return app.app.test_client()
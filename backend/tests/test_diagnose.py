@@ -0,0 +1,16 @@
+def test_batch_rejects_non_string_symptoms_per_item(client):
+    response = client.post('/api/diagnose/batch', json={'items': [
+        {'symptoms': 5},
+        {'symptoms': '   '},
+        {'symptoms': 'high fever with chills'}
+    ]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['errors'] == 2
+    assert [r['status'] for r in body['results']] == ['error', 'error', 'success']
+
+def test_diagnose_rejects_non_string_symptoms(client):
+    response = client.post('/api/diagnose', json={'symptoms': 5})
+
+    assert response.status_code == 400
@@ -0,0 +1,23 @@
+import threading
+import time
+
+import db
+from history_writer import HistoryWriter
+
+def test_queue_depth_counts_rows_being_flushed(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(db, 'add_diagnoses', lambda rows: release.wait(5))
+    monkeypatch.setattr(db, 'close_connection', lambda: None)
+    writer = HistoryWriter(flush_size=2, flush_interval_ms=1000)
+
+    writer.add_many([{'n': 1}, {'n': 2}])
+    # Both rows leave the queue for the flush, which is blocked
+    deadline = time.monotonic() + 5
+    while writer._queue.qsize() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.queue_depth == 2
+
+    release.set()
+    writer.stop()
+    assert writer.queue_depth == 0
+    assert writer.rows_written.value == 2
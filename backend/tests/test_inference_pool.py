@@ -0,0 +1,17 @@
+import pytest
+
+from inference_pool import InferencePool, PoolFull
+
+def test_admitted_takes_a_slot_but_no_worker():
+    pool = InferencePool(max_workers=1, max_queue=1)
+
+    with pool.admitted():
+        # The only worker is still free for pool work
+        assert pool.run(lambda: 'ran') == 'ran'
+        with pool.admitted():
+            with pytest.raises(PoolFull):
+                pool.run(lambda: 'rejected')
+
+    assert pool.stats()['in_flight'] == 0
+    assert pool.rejected.value == 1
+    pool.stop()
@@ -0,0 +1,13 @@
+from metrics import Histogram, PrometheusWriter
+
+def test_prometheus_values_are_not_rounded():
+    out = PrometheusWriter()
+    out.counter('requests_total', 'Requests', 1234567)
+    histogram = Histogram((1,))
+    histogram.observe(1234567.891)
+    out.histogram('latency_ms', 'Latency', histogram)
+    lines = out.text().splitlines()
+
+    assert 'medassist_requests_total 1234567' in lines
+    assert 'medassist_latency_ms_sum 1234567.891' in lines
+    assert 'medassist_latency_ms_count 1' in lines
@@ -0,0 +1,99 @@
+import time
+
+from lexicon import BOOST_MAX_CONFIDENCE, BOOST_MIN_CONFIDENCE
+from metrics import Counter, Histogram, LATENCY_MS_BUCKETS
+
+class LexiconTier:
+    """Answers from the symptom lexicon alone.
+
+    Confidence grows with the share of the disease's terms that matched,
+    over the same range the keyword boost reports. When BioBERT runs on a
+    text with a keyword hit, the boost overrides its top label anyway, so
+    confident hits can skip the forward pass.
+    """
+
+    name = 'lexicon'
+
+    def __init__(self, lexicon):
+        self.lexicon = lexicon
+
+    def predict(self, text):
+        hits = self.lexicon.disease_hits(text)
+        if not hits:
+            return None
+
+        span = BOOST_MAX_CONFIDENCE - BOOST_MIN_CONFIDENCE
+        candidates = [
+            {'disease': disease, 'confidence': BOOST_MIN_CONFIDENCE + span * self.lexicon.match_strength(disease, terms)}
+            for disease, terms in hits.items()
+        ]
+        # First disease in lexicon order wins, as in the keyword boost
+        return {
+            'disease': candidates[0]['disease'] + " (Lexicon Match)",
+            'confidence': candidates[0]['confidence'],
+            'differential': candidates
+        }
+
+class TieredPredictor:
+    """Runs cheap tiers before the model.
+
+    Each tier's ``predict(text)`` returns a prediction or None. The first
+    prediction whose confidence reaches ``threshold`` is the answer; texts
+    no tier is sure about go to ``model_predict_batch`` together.
+    """
+
+    def __init__(self, tiers, model_predict_batch, threshold, model_tier_name='biobert'):
+        self.tiers = list(tiers)
+        self.model_predict_batch = model_predict_batch
+        self.threshold = float(threshold)
+        self.model_tier_name = model_tier_name
+
+        names = [t.name for t in self.tiers] + [model_tier_name]
+        self.answered = {name: Counter() for name in names}
+        self.latency_ms = {name: Histogram(LATENCY_MS_BUCKETS) for name in names}
+
+    def predict(self, text):
+        return self.predict_batch([text])[0]
+
+    def predict_batch(self, texts):
+        predictions = [None] * len(texts)
+        remaining = []
+        for i, text in enumerate(texts):
+            predictions[i] = self._cheap_tiers(text)
+            if predictions[i] is None:
+                remaining.append(i)
+
+        if remaining:
+            started = time.perf_counter()
+            results = self.model_predict_batch([texts[i] for i in remaining])
+            # Recorded per call: one (possibly batched) forward pass
+            self.latency_ms[self.model_tier_name].observe((time.perf_counter() - started) * 1000)
+            self.answered[self.model_tier_name].inc(len(remaining))
+            for i, prediction in zip(remaining, results):
+                predictions[i] = dict(prediction, tier=self.model_tier_name)
+        return predictions
+
+    def _cheap_tiers(self, text):
+        for tier in self.tiers:
+            started = time.perf_counter()
+            prediction = tier.predict(text)
+            self.latency_ms[tier.name].observe((time.perf_counter() - started) * 1000)
+            if prediction is not None and prediction['confidence'] >= self.threshold:
+                self.answered[tier.name].inc()
+                return dict(prediction, tier=tier.name)
+        return None
+
+    def stats(self):
+        total = sum(c.value for c in self.answered.values())
+        return {
+            'enabled': True,
+            'threshold': self.threshold,
+            'tiers': {
+                name: {
+                    'answered': self.answered[name].value,
+                    'share': round(self.answered[name].value / total, 4) if total else 0.0,
+                    'latency_ms': self.latency_ms[name].snapshot()
+                }
+                for name in self.answered
+            }
+        }
@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+
+import numpy as np
+from tokenizers import Tokenizer
+
+# Sequence length used by train_biobert.py; used when the artifact does not record one
+DEFAULT_MAX_LENGTH = 128
+MAX_SUPPORTED_LENGTH = 512
+
+# Batched passes group inputs by the smallest bucket that fits them, so no
+# input is padded past its bucket
+LENGTH_BUCKETS = (16, 32, 64, 128, 256, 512)
+
+def resolve_max_length(model_max_length):
+    """Training-time max length stored with the model, or DEFAULT_MAX_LENGTH.
+
+    Tokenizers saved without an explicit limit report a huge sentinel value.
+    """
+    if not model_max_length or model_max_length > MAX_SUPPORTED_LENGTH:
+        return DEFAULT_MAX_LENGTH
+    return int(model_max_length)
+
+def length_buckets(max_length):
+    return tuple(b for b in LENGTH_BUCKETS if b < max_length) + (max_length,)
+
+class FastTokenizer:
+    """Thin wrapper over a Rust ``tokenizers.Tokenizer`` for serving.
+
+    Encodes a whole batch in one ``encode_batch`` call without padding, so the
+    caller decides how far to pad. Needs neither transformers nor torch.
+    """
+
+    def __init__(self, tokenizer, model_max_length=None):
+        self.tokenizer = tokenizer
+        self.tokenizer.no_padding()
+        self.tokenizer.no_truncation()
+        self.pad_id = self.tokenizer.token_to_id("[PAD]") or 0
+        self.model_max_length = resolve_max_length(model_max_length)
+        self._local = threading.local()
+
+    @classmethod
+    def from_dir(cls, model_dir):
+        path = os.path.join(model_dir, "tokenizer.json")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found. Save the model with a fast tokenizer.")
+
+        model_max_length = None
+        config_path = os.path.join(model_dir, "tokenizer_config.json")
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                model_max_length = json.load(f).get('model_max_length')
+        return cls(Tokenizer.from_file(path), model_max_length)
+
+    @classmethod
+    def from_transformers(cls, hf_tokenizer):
+        # Copy the backend so padding/truncation settings are not shared with transformers
+        backend = Tokenizer.from_str(hf_tokenizer.backend_tokenizer.to_str())
+        return cls(backend, hf_tokenizer.model_max_length)
+
+    def encode(self, texts, max_length=None):
+        """Token id lists for texts, truncated to max_length but keeping the final [SEP]."""
+        max_length = max_length or self.model_max_length
+        ids = []
+        for encoding in self.tokenizer.encode_batch(list(texts)):
+            row = encoding.ids
+            if len(row) > max_length:
+                row = row[:max_length - 1] + row[-1:]
+            ids.append(row)
+        return ids
+
+    def pack(self, ids, width):
+        """Pad id lists into (input_ids, attention_mask, token_type_ids) of shape (len(ids), width).
+
+        Arrays are contiguous views into per-thread buffers that are reused
+        across calls, so they are only valid until the next pack() on the
+        same thread.
+        """
+        size = len(ids) * width
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None or buffers[0].size < size:
+            capacity = max(size, 8 * MAX_SUPPORTED_LENGTH)
+            buffers = self._local.buffers = tuple(np.zeros(capacity, dtype=np.int64) for _ in range(3))
+
+        input_ids, attention_mask, token_type_ids = (b[:size].reshape(len(ids), width) for b in buffers)
+        input_ids.fill(self.pad_id)
+        attention_mask.fill(0)
+        for i, row in enumerate(ids):
+            input_ids[i, :len(row)] = row
+            attention_mask[i, :len(row)] = 1
+        return {
+            'input_ids': input_ids,
+            'attention_mask': attention_mask,
+            'token_type_ids': token_type_ids
+        }
+
+    def __call__(self, texts, max_length=None, **kwargs):
+        """Padded to the longest input, like ``tokenizer(texts, padding=True)``."""
+        ids = self.encode(texts, max_length)
+        width = max(len(row) for row in ids)
+        return {k: v.copy() for k, v in self.pack(ids, width).items()}
+
+def group_by_bucket(ids, buckets):
+    """Map each bucket width to the indices of the inputs that fit it."""
+    groups = {}
+    for i, row in enumerate(ids):
+        for width in buckets:
+            if len(row) <= width:
+                break
+        groups.setdefault(width, []).append(i)
+    return groups
@@ -1,12 +1,17 @@
-
 import torch
-from torch.utils.data import DataLoader, Dataset
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from torch.utils.data import DataLoader, Dataset, Sampler
+from transformers import AutoTokenizer, AutoModelForSequenceClassification, get_linear_schedule_with_warmup
 from torch.optim import AdamW
 from sklearn.model_selection import train_test_split
 import pandas as pd
 import numpy as np
+import argparse
 import os
+import random
+import time
+
+from dataset_cache import load_cache, tokenized_cache
+from label_config import LabelConfig, build_label_map, save_label_map
 
 # Configuration
 MODEL_NAME = "dmis-lab/biobert-v1.1"
@@ -14,136 +19,378 @@ MAX_LEN = 128
 BATCH_SIZE = 16
 EPOCHS = 3
 LEARNING_RATE = 2e-5
+WARMUP_RATIO = 0.1
 DATA_PATH = "data/expanded_training_data.csv"
 OUTPUT_DIR = "model/biobert_finetuned"
+CHECKPOINT_DIR = "model/checkpoints"
+CHECKPOINT_FILE = "last.pt"
+SEED = 42
+
+# Length-grouped sampling sorts this many batches' worth of samples at a time
+LENGTH_GROUP_BATCHES = 50
 
 class DiagnosisDataset(Dataset):
-    def __init__(self, texts, labels, tokenizer, max_len, label_map):
-        self.texts = texts
-        self.labels = labels
-        self.tokenizer = tokenizer
-        self.max_len = max_len
-        self.label_map = label_map
+    """Rows of the memory-mapped token arrays from dataset_cache.
+
+    Samples are views into the mapped files, so nothing is tokenized or
+    copied per item. Only the cache path is pickled, so DataLoader workers
+    (including spawned ones on Windows) map the files themselves.
+    """
+    def __init__(self, cache_path, indices):
+        self.cache_path = cache_path
+        self.indices = np.asarray(indices)
+        self._arrays = None
+        self.lengths = self.arrays['lengths'][self.indices]
+
+    @property
+    def arrays(self):
+        if self._arrays is None:
+            self._arrays = load_cache(self.cache_path)
+        return self._arrays
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_arrays'] = None
+        return state
 
     def __len__(self):
-        return len(self.texts)
+        return len(self.indices)
 
     def __getitem__(self, item):
-        text = str(self.texts[item])
-        label_name = self.labels[item]
-        label = self.label_map[label_name]
-
-        encoding = self.tokenizer.encode_plus(
-            text,
-            add_special_tokens=True,
-            max_length=self.max_len,
-            return_token_type_ids=False,
-            padding='max_length',
-            truncation=True,
-            return_attention_mask=True,
-            return_tensors='pt',
-        )
-
+        row = self.indices[item]
+        arrays = self.arrays
         return {
-            'text': text,
-            'input_ids': encoding['input_ids'].flatten(),
-            'attention_mask': encoding['attention_mask'].flatten(),
-            'labels': torch.tensor(label, dtype=torch.long)
+            'input_ids': torch.from_numpy(arrays['input_ids'][row]),
+            'attention_mask': torch.from_numpy(arrays['attention_mask'][row]),
+            'labels': torch.as_tensor(arrays['labels'][row])
         }
 
-def train_model():
+class LengthGroupedBatchSampler(Sampler):
+    """Batches of similar-length samples, in random order.
+
+    Shuffles the indices, sorts each window of LENGTH_GROUP_BATCHES batches
+    by length and cuts it into batches, then shuffles the batches. Combined
+    with collate_trimmed this pads each batch only to its own longest row.
+    """
+    def __init__(self, lengths, batch_size, seed=SEED):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        rng = np.random.default_rng(self.seed + self.epoch)
+        order = rng.permutation(len(self.lengths))
+        window = self.batch_size * LENGTH_GROUP_BATCHES
+
+        batches = []
+        for start in range(0, len(order), window):
+            chunk = order[start:start + window]
+            chunk = chunk[np.argsort(-self.lengths[chunk], kind='stable')]
+            batches.extend(chunk[i:i + self.batch_size] for i in range(0, len(chunk), self.batch_size))
+
+        for b in rng.permutation(len(batches)):
+            yield batches[b].tolist()
+
+def collate_trimmed(samples):
+    """Stack samples and cut the padding columns no row in the batch uses."""
+    attention_mask = torch.stack([s['attention_mask'] for s in samples])
+    width = int(attention_mask.sum(dim=1).max())
+    return {
+        'input_ids': torch.stack([s['input_ids'][:width] for s in samples]),
+        'attention_mask': attention_mask[:, :width].contiguous(),
+        'labels': torch.stack([s['labels'] for s in samples])
+    }
+
+def make_loader(dataset, batch_size, workers, length_grouped=False, shuffle=False, generator=None,
+                collate_fn=collate_trimmed):
+    kwargs = {
+        'num_workers': workers,
+        'collate_fn': collate_fn,
+        'persistent_workers': workers > 0
+    }
+    if workers > 0:
+        kwargs['prefetch_factor'] = 4
+    if length_grouped:
+        return DataLoader(dataset, batch_sampler=LengthGroupedBatchSampler(dataset.lengths, batch_size), **kwargs)
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, generator=generator, **kwargs)
+
+def configure_threads(threads, workers):
+    """Split the cores between DataLoader workers and intra-op compute threads."""
+    if not threads:
+        threads = max(1, (os.cpu_count() or 1) - workers)
+    torch.set_num_threads(threads)
+    return threads
+
+def train_epoch(model, loader, optimizer, scheduler, device, grad_accum, bf16,
+                start_batch=0, on_step=None):
+    """One pass over loader; returns (average loss, samples seen).
+
+    Batches before start_batch are skipped (resuming mid-epoch). on_step is
+    called with the index of the next batch after every optimizer step.
+    """
+    model.train()
+    total_loss = 0.0
+    samples = 0
+    steps = len(loader)
+    optimizer.zero_grad()
+
+    for batch_idx, batch in enumerate(loader):
+        if batch_idx < start_batch:
+            continue
+        if batch_idx % 5 == 0:
+            print(f"Processing batch {batch_idx}/{steps}...")
+
+        input_ids = batch['input_ids'].to(device)
+        attention_mask = batch['attention_mask'].to(device)
+        labels = batch['labels'].to(device)
+
+        with torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=bf16):
+            outputs = model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                labels=labels
+            )
+
+        loss = outputs.loss
+        total_loss += loss.item()
+        samples += len(labels)
+        (loss / grad_accum).backward()
+
+        # Step every grad_accum batches, and on the last (possibly partial) group
+        if (batch_idx + 1) % grad_accum == 0 or batch_idx + 1 == steps:
+            optimizer.step()
+            scheduler.step()
+            optimizer.zero_grad()
+            if on_step:
+                on_step(batch_idx + 1)
+
+    return total_loss / max(steps - start_batch, 1), samples
+
+@torch.no_grad()
+def evaluate(model, loader, device, bf16):
+    """Average loss and accuracy over loader."""
+    model.eval()
+    total_loss = 0.0
+    correct = 0
+    samples = 0
+    for batch in loader:
+        labels = batch['labels'].to(device)
+        with torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=bf16):
+            outputs = model(
+                input_ids=batch['input_ids'].to(device),
+                attention_mask=batch['attention_mask'].to(device),
+                labels=labels
+            )
+        total_loss += outputs.loss.item() * len(labels)
+        correct += (outputs.logits.argmax(dim=-1) == labels).sum().item()
+        samples += len(labels)
+    return total_loss / max(samples, 1), correct / max(samples, 1)
+
+def rng_state():
+    state = {
+        'python': random.getstate(),
+        'numpy': np.random.get_state(),
+        'torch': torch.get_rng_state()
+    }
+    if torch.cuda.is_available():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+def set_rng_state(state):
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    torch.set_rng_state(state['torch'])
+    if 'cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state['cuda'])
+
+def save_checkpoint(path, **state):
+    """Write atomically, so a crash mid-save keeps the previous checkpoint."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path):
+    # Contains optimizer and RNG state, not just tensors
+    return torch.load(path, map_location="cpu", weights_only=False)
+
+def train_model(args):
     print(f"Starting training with {MODEL_NAME}...")
-    
+
     # Create output directory
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
     # Load Data
-    if not os.path.exists(DATA_PATH):
-        print(f"Error: {DATA_PATH} not found. Please create dummy data first.")
+    if not os.path.exists(args.data):
+        print(f"Error: {args.data} not found. Please create dummy data first.")
         return
 
-    df = pd.read_csv(DATA_PATH)
-    
-    # Create label mapping
-    unique_labels = df['disease'].unique()
-    label_map = {label: i for i, label in enumerate(unique_labels)}
-    
-    # Save label map
-    import json
-    with open(os.path.join(OUTPUT_DIR, 'label_map.json'), 'w') as f:
-        json.dump(label_map, f)
+    df = pd.read_csv(args.data)
 
-    # Split data
-    df_train, df_val = train_test_split(df, test_size=0.2, random_state=42)
+    # Label ids sorted by name; persisted both as label_map.json and as
+    # id2label in the model config so serving reads them from the artifact
+    label_map = build_label_map(df['disease'])
+    save_label_map(OUTPUT_DIR, label_map)
+    label_config = LabelConfig(sorted(label_map, key=label_map.get))
 
     tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
     model = AutoModelForSequenceClassification.from_pretrained(
-        MODEL_NAME, 
-        num_labels=len(unique_labels)
+        MODEL_NAME,
+        **label_config.config_kwargs()
     )
 
-    train_dataset = DiagnosisDataset(
-        df_train['symptoms'].to_numpy(),
-        df_train['disease'].to_numpy(),
+    # Tokenize once (cached on disk across runs), then split by row index
+    cache_path = tokenized_cache(
         tokenizer,
-        MAX_LEN,
-        label_map
+        df['symptoms'].astype(str).tolist(),
+        df['disease'].map(label_map).tolist(),
+        MAX_LEN
     )
+    train_idx, val_idx = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
 
-    val_dataset = DiagnosisDataset(
-        df_val['symptoms'].to_numpy(),
-        df_val['disease'].to_numpy(),
-        tokenizer,
-        MAX_LEN,
-        label_map
-    )
+    train_dataset = DiagnosisDataset(cache_path, train_idx)
+    val_dataset = DiagnosisDataset(cache_path, val_idx)
 
-    train_loader = DataLoader(train_dataset, batch_size=BATCH_SIZE, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=BATCH_SIZE)
+    threads = configure_threads(args.threads, args.workers)
+    # Shuffle order is reseeded per epoch so a resumed epoch replays the same batches
+    generator = torch.Generator()
+    train_loader = make_loader(train_dataset, args.batch_size, args.workers,
+                               length_grouped=args.length_grouped, shuffle=True, generator=generator)
+    val_loader = make_loader(val_dataset, args.batch_size, args.workers)
 
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print("Device:", device)
     model = model.to(device)
     optimizer = AdamW(model.parameters(), lr=LEARNING_RATE)
+    total_steps = -(-len(train_loader) // args.grad_accum) * args.epochs
+    scheduler = get_linear_schedule_with_warmup(optimizer, int(total_steps * WARMUP_RATIO), total_steps)
+
+    # Progress that is saved in checkpoints
+    progress = {
+        'epoch': 0,
+        'batch': 0,
+        'best_val_loss': float('inf'),
+        'best_epoch': None,
+        'bad_epochs': 0
+    }
+
+    checkpoint_path = os.path.join(args.checkpoint_dir, CHECKPOINT_FILE)
+    if args.resume:
+        resume_path = checkpoint_path if args.resume == 'auto' else args.resume
+        if os.path.exists(resume_path):
+            checkpoint = load_checkpoint(resume_path)
+            if checkpoint['cache_path'] != cache_path:
+                print(f"Warning: checkpoint was trained on {checkpoint['cache_path']}, data is now {cache_path}")
+            model.load_state_dict(checkpoint['model'])
+            optimizer.load_state_dict(checkpoint['optimizer'])
+            scheduler.load_state_dict(checkpoint['scheduler'])
+            set_rng_state(checkpoint['rng'])
+            progress.update(checkpoint['progress'])
+            print(f"Resumed from {resume_path} at epoch {progress['epoch'] + 1}, batch {progress['batch']}")
+        elif args.resume != 'auto':
+            print(f"Error: checkpoint {resume_path} not found")
+            return
+
+    def checkpoint(batch=0):
+        progress['batch'] = batch
+        save_checkpoint(
+            checkpoint_path,
+            model=model.state_dict(),
+            optimizer=optimizer.state_dict(),
+            scheduler=scheduler.state_dict(),
+            rng=rng_state(),
+            progress=dict(progress),
+            cache_path=cache_path
+        )
+
+    def on_step(next_batch):
+        if args.checkpoint_steps and scheduler.last_epoch % args.checkpoint_steps == 0:
+            checkpoint(next_batch)
+            print(f"Checkpoint saved at epoch {progress['epoch'] + 1}, batch {next_batch}")
+
+    config = (f"device={device} threads={threads} workers={args.workers} batch_size={args.batch_size} "
+              f"grad_accum={args.grad_accum} (effective {args.batch_size * args.grad_accum}) "
+              f"bf16={args.bf16} length_grouped={args.length_grouped}")
+    print(f"Config: {config}")
 
     print("Starting training loop...")
-    # Training Loop
-    for epoch in range(EPOCHS):
-        print(f"Epoch {epoch+1}/{EPOCHS} starting...")
-        model.train()
-        total_loss = 0
-        batch_idx = 0
-        for batch in train_loader:
-            if batch_idx % 5 == 0:
-                print(f"Processing batch {batch_idx}...")
-            batch_idx += 1
-            
-            input_ids = batch['input_ids'].to(device)
-            attention_mask = batch['attention_mask'].to(device)
-            labels = batch['labels'].to(device)
+    total_samples = 0
+    total_seconds = 0.0
+    epochs_run = 0
+    while progress['epoch'] < args.epochs:
+        epoch = progress['epoch']
+        print(f"Epoch {epoch+1}/{args.epochs} starting...")
+        generator.manual_seed(SEED + epoch)
+        if isinstance(train_loader.batch_sampler, LengthGroupedBatchSampler):
+            train_loader.batch_sampler.set_epoch(epoch)
 
-            outputs = model(
-                input_ids=input_ids,
-                attention_mask=attention_mask,
-                labels=labels
-            )
+        started = time.perf_counter()
+        avg_train_loss, samples = train_epoch(model, train_loader, optimizer, scheduler, device,
+                                              args.grad_accum, args.bf16,
+                                              start_batch=progress['batch'], on_step=on_step)
+        seconds = time.perf_counter() - started
+        total_samples += samples
+        total_seconds += seconds
+        epochs_run += 1
+        print(f"Epoch {epoch+1}/{args.epochs} - Average Training Loss: {avg_train_loss:.4f} - "
+              f"{seconds:.1f}s, {samples / seconds:.1f} samples/s")
 
-            loss = outputs.loss
-            total_loss += loss.item()
+        val_loss, val_acc = evaluate(model, val_loader, device, args.bf16)
+        print(f"Epoch {epoch+1}/{args.epochs} - Validation Loss: {val_loss:.4f} - Accuracy: {val_acc:.2%}")
 
-            loss.backward()
-            optimizer.step()
-            optimizer.zero_grad()
+        progress['epoch'] = epoch + 1
+        if val_loss < progress['best_val_loss'] - args.min_delta:
+            progress.update(best_val_loss=val_loss, best_epoch=epoch + 1, bad_epochs=0)
+            # Keep the best model as the artifact, not the last one
+            print(f"New best model, saving to {OUTPUT_DIR}...")
+            model.save_pretrained(OUTPUT_DIR)
+        else:
+            progress['bad_epochs'] += 1
+        checkpoint()
+
+        if progress['bad_epochs'] >= args.patience:
+            print(f"Early stopping: no validation improvement for {args.patience} epochs")
+            break
 
-        avg_train_loss = total_loss / len(train_loader)
-        print(f"Epoch {epoch+1}/{EPOCHS} - Average Training Loss: {avg_train_loss:.4f}")
+    if epochs_run:
+        print(f"Throughput: {total_samples / total_seconds:.1f} samples/s over {epochs_run} epochs "
+              f"({total_seconds / epochs_run:.1f}s/epoch) | {config}")
+    print(f"Best epoch: {progress['best_epoch']} (validation loss {progress['best_val_loss']:.4f})")
 
-    # Save Model
-    print(f"Saving model to {OUTPUT_DIR}...")
-    model.save_pretrained(OUTPUT_DIR)
+    # Record the training sequence length so serving truncates the same way
+    tokenizer.model_max_length = MAX_LEN
     tokenizer.save_pretrained(OUTPUT_DIR)
     print("Training complete!")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fine-tune BioBERT on the symptom dataset")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--grad-accum', type=int, default=1,
+                        help="Batches per optimizer step (effective batch = batch size x grad accum)")
+    parser.add_argument('--workers', type=int, default=0, help="DataLoader worker processes")
+    parser.add_argument('--threads', type=int, default=0,
+                        help="Intra-op threads (0 = CPU count minus workers)")
+    parser.add_argument('--bf16', action='store_true', help="bfloat16 autocast (CPUs with AVX512-BF16/AMX)")
+    parser.add_argument('--length-grouped', action='store_true',
+                        help="Batch samples of similar length together to reduce padding")
+    parser.add_argument('--patience', type=int, default=2,
+                        help="Stop after this many epochs without validation loss improvement")
+    parser.add_argument('--min-delta', type=float, default=1e-4, help="Minimum validation loss improvement")
+    parser.add_argument('--checkpoint-dir', default=CHECKPOINT_DIR)
+    parser.add_argument('--checkpoint-steps', type=int, default=0,
+                        help="Also checkpoint every N optimizer steps (0 = end of each epoch only)")
+    parser.add_argument('--resume', nargs='?', const='auto',
+                        help="Resume from a checkpoint file (default: the last one in --checkpoint-dir)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    train_model()
+    train_model(parse_args())
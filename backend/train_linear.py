@@ -0,0 +1,138 @@
+"""
+Train the lightweight linear model served when torch is not installed.
+
+Hashed word/character n-gram tf-idf features and a softmax classifier,
+trained with mini-batch Adagrad in NumPy alone, so this also runs in a
+requirements-lite environment (e.g. as a deploy build step). The artifact is
+a compressed .npz plus a config.json with id2label in model/linear.
+
+Usage: python train_linear.py [--data data/expanded_training_data.csv]
+"""
+
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+
+from label_config import build_label_map
+from linear_model import LINEAR_MODEL_DIR, N_FEATURES, HashedNgramVectorizer, LinearModel, sparse_dot
+
+DATA_PATH = "data/expanded_training_data.csv"
+FALLBACK_DATA_PATH = "data/training_data.csv"
+EPOCHS = 30
+BATCH_SIZE = 64
+LEARNING_RATE = 0.5
+L2 = 1e-5
+VAL_SPLIT = 0.2
+SEED = 42
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = [(r['symptoms'], r['disease']) for r in csv.DictReader(f)]
+    return [t for t, _ in rows], [d for _, d in rows]
+
+def batch_rows(indptr, indices, data, rows):
+    """Sub-CSR of the given rows."""
+    starts, ends = indptr[rows], indptr[rows + 1]
+    lengths = ends - starts
+    take = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)]) if len(rows) else np.empty(0, dtype=np.int64)
+    return np.concatenate([[0], np.cumsum(lengths)]), indices[take], data[take]
+
+def softmax(logits):
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+def fit(X, y, n_features, num_labels, epochs, batch_size, lr, l2, seed):
+    """Softmax regression by mini-batch Adagrad.
+
+    Gradients only touch the feature rows present in the batch, so a step
+    costs O(non-zeros x labels) however large the hashed feature space is.
+    """
+    indptr, indices, data = X
+    weights = np.zeros((n_features, num_labels), dtype=np.float32)
+    bias = np.zeros(num_labels, dtype=np.float32)
+    weight_sq = np.full_like(weights, 1e-8)
+    bias_sq = np.full_like(bias, 1e-8)
+    rng = np.random.default_rng(seed)
+    n = len(indptr) - 1
+
+    for epoch in range(epochs):
+        order = rng.permutation(n)
+        total_loss = 0.0
+        for start in range(0, n, batch_size):
+            rows = order[start:start + batch_size]
+            b_indptr, b_indices, b_data = batch_rows(indptr, indices, data, rows)
+            probs = softmax(sparse_dot(b_indptr, b_indices, b_data, weights, bias))
+            total_loss -= np.log(probs[np.arange(len(rows)), y[rows]] + 1e-12).sum()
+
+            grad = probs
+            grad[np.arange(len(rows)), y[rows]] -= 1
+            grad /= len(rows)
+
+            feature_rows = np.repeat(np.arange(len(rows)), np.diff(b_indptr))
+            touched, inverse = np.unique(b_indices, return_inverse=True)
+            weight_grad = np.zeros((len(touched), num_labels), dtype=np.float32)
+            np.add.at(weight_grad, inverse, grad[feature_rows] * b_data[:, None])
+            weight_grad += l2 * weights[touched]
+
+            weight_sq[touched] += weight_grad ** 2
+            weights[touched] -= lr * weight_grad / np.sqrt(weight_sq[touched])
+            bias_grad = grad.sum(axis=0)
+            bias_sq += bias_grad ** 2
+            bias -= lr * bias_grad / np.sqrt(bias_sq)
+
+        print(f"Epoch {epoch + 1}/{epochs} - loss {total_loss / n:.4f}")
+    return weights, bias
+
+def train_linear(args):
+    data_path = args.data
+    if not os.path.exists(data_path) and data_path == DATA_PATH:
+        data_path = FALLBACK_DATA_PATH
+    if not os.path.exists(data_path):
+        print(f"Error: {data_path} not found.")
+        return
+
+    texts, diseases = read_rows(data_path)
+    label_map = build_label_map(diseases)
+    labels = sorted(label_map, key=label_map.get)
+    y = np.array([label_map[d] for d in diseases])
+    print(f"Training linear model on {len(texts)} rows from {data_path} ({len(labels)} labels)")
+
+    rng = np.random.default_rng(SEED)
+    order = rng.permutation(len(texts))
+    n_val = int(len(texts) * VAL_SPLIT)
+    val_idx, train_idx = order[:n_val], order[n_val:]
+
+    started = time.perf_counter()
+    vectorizer = HashedNgramVectorizer(args.n_features).fit_idf([texts[i] for i in train_idx])
+    X = vectorizer.transform(texts)
+    weights, bias = fit(
+        batch_rows(*X, train_idx), y[train_idx], args.n_features, len(labels),
+        args.epochs, args.batch_size, args.lr, args.l2, SEED
+    )
+    model = LinearModel(weights, bias, vectorizer)
+    print(f"Trained in {time.perf_counter() - started:.2f}s")
+
+    if n_val:
+        predicted = model.logits([texts[i] for i in val_idx]).argmax(axis=1)
+        print(f"Validation accuracy: {(predicted == y[val_idx]).mean():.4f} ({n_val} rows)")
+
+    model.save(args.output, labels)
+    print(f"Model saved to {args.output}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the hashed n-gram linear model")
+    parser.add_argument('--data', default=DATA_PATH,
+                        help=f"Training CSV (falls back to {FALLBACK_DATA_PATH} if the default is missing)")
+    parser.add_argument('--output', default=LINEAR_MODEL_DIR)
+    parser.add_argument('--n-features', type=int, default=N_FEATURES, help="Hash buckets")
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--lr', type=float, default=LEARNING_RATE)
+    parser.add_argument('--l2', type=float, default=L2)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    train_linear(parse_args())
@@ -109,6 +109,8 @@ document.addEventListener('DOMContentLoaded', () => {
     checkServerStatus();
     setupEventListeners();
     renderCommonSymptoms();
+    // Prefetch; offline diagnosis awaits the same promise
+    loadSymptomLexicon().catch(error => console.error(error));
 });
 
 // Event Listeners
@@ -239,12 +241,12 @@ async function handleDiagnosis(e) {
         // Try offline diagnosis as fallback
         console.log('🔄 Switching to offline diagnosis mode...');
         try {
-            const offlineResult = performOfflineDiagnosis(diagnosisData);
+            const offlineResult = await performOfflineDiagnosis(diagnosisData);
             displayResults(offlineResult);
             displayOfflineNotice();
         } catch (offlineError) {
             console.error('Offline diagnosis also failed:', offlineError);
-            displayError(error.message);
+            displayError(`${error.message}. ${offlineError.message}`);
         }
     } finally {
         showLoading(false);
@@ -568,9 +570,61 @@ window.removeSymptom = removeSymptom;
 
 // ============ OFFLINE DIAGNOSIS FUNCTIONALITY ============
 
-function performOfflineDiagnosis(diagnosisData) {
+// Symptom lexicon shared with the server (backend/data/symptom_lexicon.json,
+// exported by backend/lexicon.py). Cached by the service worker for offline use.
+// Without it the rules cannot match anything, so a failed load is an error,
+// never an empty match; the next call retries the fetch.
+let symptomLexiconPromise = null;
+
+function loadSymptomLexicon() {
+    if (!symptomLexiconPromise) {
+        symptomLexiconPromise = fetch('symptom_lexicon.json')
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                return response.json();
+            })
+            .then(compileLexicon)
+            .catch(error => {
+                symptomLexiconPromise = null;
+                throw new Error(`Offline diagnosis unavailable: could not load the symptom lexicon (${error.message})`);
+            });
+    }
+    return symptomLexiconPromise;
+}
+
+// Compile every term into one regex, the same way the server does: a
+// lookahead tries each position, the longest term wins and shorter terms
+// that are its prefixes are added.
+function compileLexicon(data) {
+    const termCategories = new Map();
+    for (const [category, terms] of Object.entries(data.categories || {})) {
+        for (const term of terms) {
+            const key = term.toLowerCase();
+            if (!termCategories.has(key)) termCategories.set(key, []);
+            termCategories.get(key).push(category);
+        }
+    }
+    const terms = [...termCategories.keys()].sort((a, b) => b.length - a.length);
+    const escaped = terms.map(t => t.replace(/[.*+?^${}()|[\]\\]/g, '\\$&'));
+    const prefixes = new Map(terms.map(t => [t, terms.filter(p => p !== t && t.startsWith(p))]));
+    return { termCategories, prefixes, pattern: new RegExp(`(?=(${escaped.join('|')}))`, 'g') };
+}
+
+// Set of lexicon categories matched by the (lowercased) symptom text
+function matchCategories(lexicon, symptomsLower) {
+    const categories = new Set();
+    for (const m of symptomsLower.matchAll(lexicon.pattern)) {
+        for (const term of [m[1], ...lexicon.prefixes.get(m[1])]) {
+            lexicon.termCategories.get(term).forEach(c => categories.add(c));
+        }
+    }
+    return categories;
+}
+
+async function performOfflineDiagnosis(diagnosisData) {
     const { symptoms, vital_signs, medical_history, language, age, weight, gender } = diagnosisData;
     const symptomsLower = symptoms.toLowerCase();
+    const matched = matchCategories(await loadSymptomLexicon(), symptomsLower);
 
     // Initialize diagnosis structure
     let diagnosis = {
@@ -608,7 +662,7 @@ function performOfflineDiagnosis(diagnosisData) {
     }
 
     // Fever-related conditions
-    if (hasFeverSymptoms(symptomsLower)) {
+    if (matched.has('fever')) {
         if (temp > 103) {
             diagnosis.primary_diagnosis = 'High Fever - Possible Severe Infection';
             diagnosis.confidence_score = 78;
@@ -627,7 +681,7 @@ function performOfflineDiagnosis(diagnosisData) {
             ];
 
             // Check for dengue/malaria symptoms
-            if (symptomsLower.includes('joint pain') || symptomsLower.includes('rash') || symptomsLower.includes('bleeding')) {
+            if (matched.has('dengue_signs')) {
                 diagnosis.differential_diagnoses.push({
                     condition: 'Dengue Fever',
                     probability: 0.65,
@@ -636,7 +690,7 @@ function performOfflineDiagnosis(diagnosisData) {
                 diagnosis.immediate_actions.push('Blood test for dengue/malaria recommended');
             }
 
-            if (symptomsLower.includes('chills') || symptomsLower.includes('shivering') || symptomsLower.includes('sweating')) {
+            if (matched.has('malaria_signs')) {
                 diagnosis.differential_diagnoses.push({
                     condition: 'Malaria',
                     probability: 0.5,
@@ -659,8 +713,8 @@ function performOfflineDiagnosis(diagnosisData) {
     }
 
     // Respiratory symptoms
-    if (hasRespiratorySymptoms(symptomsLower)) {
-        if (symptomsLower.includes('difficulty breathing') || symptomsLower.includes('chest pain') || symptomsLower.includes('shortness of breath')) {
+    if (matched.has('respiratory')) {
+        if (matched.has('lower_respiratory')) {
             diagnosis.primary_diagnosis = 'Lower Respiratory Tract Infection - Possible Pneumonia';
             diagnosis.confidence_score = 75;
             diagnosis.referral_needed = true;
@@ -686,7 +740,7 @@ function performOfflineDiagnosis(diagnosisData) {
     }
 
     // Gastrointestinal symptoms
-    if (hasGISymptoms(symptomsLower)) {
+    if (matched.has('gi')) {
         diagnosis.primary_diagnosis = 'Acute Gastroenteritis';
         diagnosis.confidence_score = 78;
         diagnosis.immediate_actions = [
@@ -706,7 +760,7 @@ function performOfflineDiagnosis(diagnosisData) {
             'Maintain strict hand hygiene'
         ];
 
-        if (symptomsLower.includes('blood') || symptomsLower.includes('severe')) {
+        if (matched.has('gi_danger')) {
             diagnosis.referral_needed = true;
             diagnosis.red_flags = ['Blood in stool', 'Severe dehydration risk'];
             diagnosis.treatment_protocol.medications.push(
@@ -716,8 +770,8 @@ function performOfflineDiagnosis(diagnosisData) {
     }
 
     // Headache
-    if (hasHeadacheSymptoms(symptomsLower)) {
-        if (symptomsLower.includes('severe') || symptomsLower.includes('worst') || symptomsLower.includes('sudden') || symptomsLower.includes('vision') || symptomsLower.includes('confusion')) {
+    if (matched.has('headache')) {
+        if (matched.has('headache_danger')) {
             diagnosis.primary_diagnosis = 'Severe Headache - Requires Evaluation';
             diagnosis.confidence_score = 65;
             diagnosis.referral_needed = true;
@@ -738,8 +792,7 @@ function performOfflineDiagnosis(diagnosisData) {
     }
 
     // Diabetes symptoms
-    if (symptomsLower.includes('excessive thirst') || symptomsLower.includes('frequent urination') ||
-        (symptomsLower.includes('weight loss') && symptomsLower.includes('fatigue'))) {
+    if (matched.has('diabetes_signs') || (matched.has('weight_loss') && matched.has('fatigue'))) {
         diagnosis.primary_diagnosis = 'Possible Diabetes - Screening Required';
         diagnosis.confidence_score = 68;
         diagnosis.referral_needed = true;
@@ -779,7 +832,7 @@ function performOfflineDiagnosis(diagnosisData) {
     }
 
     // Body ache/pain
-    if ((symptomsLower.includes('body ache') || symptomsLower.includes('body pain') || symptomsLower.includes('muscle pain'))
+    if (matched.has('body_ache')
         && diagnosis.primary_diagnosis === 'General Malaise - Requires Examination') {
         diagnosis.primary_diagnosis = 'Viral Myalgia (Body Ache)';
         diagnosis.confidence_score = 68;
@@ -791,27 +844,6 @@ function performOfflineDiagnosis(diagnosisData) {
     return formatOfflineResult(diagnosis, language);
 }
 
-// Helper functions for symptom detection
-function hasFeverSymptoms(symptoms) {
-    const feverKeywords = ['fever', 'बुखार', 'காய்ச்சல்', 'జ్వరం', 'জ্বর', 'high temperature'];
-    return feverKeywords.some(keyword => symptoms.includes(keyword));
-}
-
-function hasRespiratorySymptoms(symptoms) {
-    const respiratoryKeywords = ['cough', 'cold', 'खांसी', 'सर्दी', 'இருமல்', 'దగ్గు', 'কাশি', 'runny nose', 'sore throat'];
-    return respiratoryKeywords.some(keyword => symptoms.includes(keyword));
-}
-
-function hasGISymptoms(symptoms) {
-    const giKeywords = ['diarrhea', 'diarrhoea', 'loose stool', 'vomiting', 'दस्त', 'उल्टी', 'வயிற்றுப்போக்கு', 'విరేచనాలు', 'ডায়রিয়া', 'nausea'];
-    return giKeywords.some(keyword => symptoms.includes(keyword));
-}
-
-function hasHeadacheSymptoms(symptoms) {
-    const headacheKeywords = ['headache', 'head pain', 'सिरदर्द', 'தலைவலி', 'తలనొప్పి', 'মাথাব্যথা'];
-    return headacheKeywords.some(keyword => symptoms.includes(keyword));
-}
-
 // Format offline result with language-specific patient explanation
 function formatOfflineResult(diagnosis, language) {
     // Add language-specific patient explanation
@@ -1,11 +1,12 @@
 
-const CACHE_NAME = 'medassist-v1';
+const CACHE_NAME = 'medassist-v2';
 const ASSETS_TO_CACHE = [
     '/',
     '/index.html',
     '/styles.css',
     '/app.js',
     '/offline_helpers.js',
+    '/symptom_lexicon.json',
     '/manifest.json',
     '/icons/icon-192.png',
     '/icons/icon-512.png'